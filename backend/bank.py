@@ -0,0 +1,169 @@
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+# --- Question Bank ---
+# Every question the app generates or extracts is kept in a SQLite database
+# with an FTS5 index over the question and chapter text. Each entry records
+# where it came from: the chapter, question type, marks and a hash of the
+# source text (pasted text, chapter slice, syllabus or uploaded file), so a
+# "bank first" request is only ever filled with questions made from the same
+# material. Identical questions for the same source are stored once.
+QUESTION_BANK_PATH = os.environ.get(
+    "QUESTION_BANK_PATH", os.path.join(tempfile.gettempdir(), "qpg-question-bank.sqlite3")
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    question TEXT NOT NULL,
+    chapter TEXT NOT NULL DEFAULT '',
+    type TEXT NOT NULL DEFAULT '',
+    marks INTEGER,
+    source TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    created REAL NOT NULL,
+    UNIQUE (source_hash, type, marks, question)
+);
+CREATE INDEX IF NOT EXISTS questions_source ON questions (source_hash, type, marks);
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+    question, chapter, content='questions', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS questions_ai AFTER INSERT ON questions BEGIN
+    INSERT INTO questions_fts (rowid, question, chapter) VALUES (new.id, new.question, new.chapter);
+END;
+CREATE TRIGGER IF NOT EXISTS questions_ad AFTER DELETE ON questions BEGIN
+    INSERT INTO questions_fts (questions_fts, rowid, question, chapter)
+    VALUES ('delete', old.id, old.question, old.chapter);
+END;
+"""
+
+# MCQ choices ("a) ...", "(b) ...") come on lines of their own below their question
+OPTION_LINE = re.compile(r"^\(?[a-eA-E][\.\)]\s")
+
+
+def question_blocks(lines: list[str]) -> list[str]:
+    """Response lines as one entry per question, its MCQ choices on the lines below it.
+
+    Choice-like lines before the first question are the model's "A)" preamble
+    and are left out.
+    """
+    blocks = []
+    for line in lines:
+        if not OPTION_LINE.match(line):
+            blocks.append(line)
+        elif blocks:
+            blocks[-1] += "\n" + line
+    return blocks
+
+
+def question_lines(blocks: list[str]) -> list[str]:
+    """Stored questions back as response lines."""
+    return [line for block in blocks for line in block.split("\n")]
+
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).encode()).hexdigest()
+
+
+def fts_query(text: str) -> str:
+    """Free text as an FTS5 query: every word must match, as a prefix."""
+    words = "".join(c if c.isalnum() else " " for c in text).split()
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class QuestionBank:
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use; one connection shared by the I/O threads under the lock
+        if self._db is None:
+            db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    def add(self, questions: list[str], source: str, source_hash: str,
+            chapter: str = "", type: str = "", marks: int | None = None) -> int:
+        """Store questions (see question_blocks) from one source; returns how many were new."""
+        now = time.time()
+        rows = [(q.strip(), chapter.strip().lower(), type, marks, source, source_hash, now)
+                for q in questions if q.strip()]
+        with self._lock:
+            db = self._connect()
+            with db:
+                before = db.total_changes
+                db.executemany(
+                    "INSERT OR IGNORE INTO questions (question, chapter, type, marks, source, source_hash, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                return db.total_changes - before
+
+    def take(self, source_hash: str, count: int, type: str = "", marks: int | None = None) -> list[str]:
+        """Up to ``count`` stored questions for the same source, type and marks, oldest first."""
+        if count <= 0:
+            return []
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT question FROM questions WHERE source_hash = ? AND type = ? AND marks IS ? "
+                "ORDER BY id LIMIT ?",
+                (source_hash, type, marks, count)
+            ).fetchall()
+        questions = [row[0] for row in rows]
+        self.hits += len(questions)
+        self.misses += count - len(questions)
+        return questions
+
+    def search(self, query: str = "", chapter: str = "", type: str | None = None,
+               marks: int | None = None, limit: int = 20) -> list[dict]:
+        """Full-text search over question and chapter text, best matches first."""
+        match = " AND ".join(part for part in (
+            fts_query(query),
+            f"chapter : ({fts_query(chapter)})" if fts_query(chapter) else "",
+        ) if part)
+        sql = ("SELECT q.id, q.question, q.chapter, q.type, q.marks, q.source, q.source_hash "
+               "FROM questions q")
+        where, params = [], []
+        if match:
+            sql += " JOIN questions_fts f ON f.rowid = q.id"
+            where.append("questions_fts MATCH ?")
+            params.append(match)
+        if type is not None:
+            where.append("q.type = ?")
+            params.append(type)
+        if marks is not None:
+            where.append("q.marks = ?")
+            params.append(marks)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY " + ("f.rank" if match else "q.id DESC") + " LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        columns = ("id", "question", "chapter", "type", "marks", "source", "source_hash")
+        return [dict(zip(columns, row)) for row in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._connect().execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+question_bank = QuestionBank(QUESTION_BANK_PATH)
@@ -0,0 +1,152 @@
+"""Near-duplicate detection at question-bank scale.
+
+Indexes --bank synthetic questions, then looks up --queries questions of
+which half are rewordings of banked ones (a function word dropped, filler
+like "briefly" added, punctuation changed) and half are new. Reports index
+build time and size, per-query latency, recall on the planted rewordings,
+and, for a sample, agreement with a brute-force Jaccard scan of the whole
+bank. Real question pairs are checked too: rewordings that must match and
+distinct-but-similar questions (mergesort/quicksort, layer 3/layer 4) that
+must not. Also times filtering a 50-question paper against the bank, the way
+a mock test is assembled.
+
+Usage (from backend/):
+    python benchmarks/bench_dedup.py --bank 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dedup  # noqa: E402
+
+OPENERS = ["Explain", "Describe", "What is", "Define", "Compare", "Discuss", "List the features of",
+           "Write short notes on", "Differentiate between", "Illustrate with an example"]
+FUNCTION_WORDS = ["the", "of", "a", "and", "in"]
+FILLER = ["briefly", "in detail", "with examples", "with a neat diagram"]
+
+REWORDED_PAIRS = [
+    ("What is deadlock? Explain with an example.", "What is a deadlock? Explain with an example."),
+    ("Describe the working of a two-pass assembler.", "Describe the working of two pass assembler in detail."),
+    ("Explain paging in operating systems.", "Explain paging in operating systems briefly."),
+    ("Define normalization and explain 3NF.", "Define normalization. Explain 3NF."),
+    ("What are the advantages of virtual memory?", "What are the advantages of using virtual memory?"),
+    ("Differentiate between process and thread.", "Differentiate between a process and a thread."),
+    ("Explain the working of TCP three way handshake",
+     "Explain the working of the TCP three-way handshake with a diagram."),
+]
+DISTINCT_PAIRS = [
+    ("What is the time complexity of mergesort?", "What is the time complexity of quicksort?"),
+    ("Explain layer 4 of the OSI model.", "Explain layer 3 of the OSI model."),
+    ("What are the advantages of virtual memory?", "What are the disadvantages of virtual memory?"),
+    ("Explain the first normal form.", "Explain the second normal form."),
+    ("Differentiate between process and thread.", "Differentiate between process and program."),
+    ("Explain the working of TCP.", "Explain the working of UDP."),
+    ("What is a primary key?", "What is a foreign key?"),
+    ("Explain inorder traversal of a binary tree with an example.",
+     "Explain preorder traversal of a binary tree with an example."),
+    ("Explain stack using arrays.", "Explain queue using arrays."),
+    ("Write a program to reverse a linked list.", "Write a program to reverse a doubly linked list."),
+    ("Why is paging used?", "How is paging used?"),
+    ("What is a deadlock?", "Why does a deadlock occur?"),
+]
+
+
+def make_vocabulary(rng: random.Random, size: int) -> list[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(size)]
+
+
+def make_question(rng: random.Random, vocabulary: list[str]) -> str:
+    words = []
+    for _ in range(rng.randint(3, 8)):
+        words.append(rng.choice(vocabulary))
+        if rng.random() < 0.4:
+            words.append(rng.choice(FUNCTION_WORDS))
+    return f"{rng.choice(OPENERS)} {' '.join(words)}."
+
+
+def reword(rng: random.Random, question: str) -> str:
+    words = question.rstrip(".").split()
+    dropped = [i for i, word in enumerate(words) if i and word in FUNCTION_WORDS]
+    if dropped and rng.random() < 0.5:
+        del words[rng.choice(dropped)]
+    else:
+        words.insert(rng.randrange(1, len(words) + 1), rng.choice(FILLER))
+    return " ".join(words) + rng.choice(("?", ".", ""))
+
+
+def pair_matches(pairs: list[tuple[str, str]]) -> int:
+    """How many second questions an index holding only the first one flags as a duplicate."""
+    matched = 0
+    for first, second in pairs:
+        index = dedup.QuestionIndex()
+        index.add_many([first])
+        matched += index.find_many([second])[0] is not None
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bank", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--brute-force", type=int, default=20, help="queries checked against a full scan")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng, 20_000)
+    bank = [make_question(rng, vocabulary) for _ in range(args.bank)]
+
+    start = time.perf_counter()
+    index = dedup.QuestionIndex()
+    index.add_many(bank)
+    build = time.perf_counter() - start
+    size = index._keys.nbytes + index._sorted_keys.nbytes + index._sorted_ids.nbytes \
+        + sum(s.nbytes for s in index._shingles)
+    print(f"index: {len(index)} questions in {build:.2f}s "
+          f"({len(index) / build:,.0f}/s), ~{size / 1e6:.0f} MB of arrays")
+
+    planted = rng.sample(range(args.bank), args.queries // 2)
+    queries = [reword(rng, bank[i]) for i in planted]
+    queries += [make_question(rng, vocabulary) for _ in range(args.queries - len(planted))]
+
+    start = time.perf_counter()
+    matches = index.find_many(queries)
+    lookup = time.perf_counter() - start
+    recalled = sum(m is not None for m in matches[:len(planted)])
+    false_hits = sum(m is not None for m in matches[len(planted):])
+    print(f"lookup: {len(queries)} queries in {lookup:.2f}s ({lookup / len(queries) * 1e6:.0f} µs/query)")
+    print(f"planted rewordings found: {recalled}/{len(planted)} ({recalled / len(planted):.1%}), "
+          f"matches for new questions: {false_hits}")
+
+    # Ground truth for a sample: exact Jaccard against every banked question
+    sample = rng.sample(range(len(queries)), min(args.brute_force, len(queries)))
+    bank_shingles = index._shingles
+    start = time.perf_counter()
+    agree = 0
+    for q in sample:
+        s = dedup.shingles(queries[q])
+        truth = any(dedup.jaccard(s, other) >= index.threshold for other in bank_shingles)
+        agree += truth == (matches[q] is not None)
+    brute = (time.perf_counter() - start) / len(sample)
+    print(f"brute force: {brute * 1000:.0f} ms/query ({brute / (lookup / len(queries)):,.0f}x slower), "
+          f"LSH agrees on {agree}/{len(sample)}")
+
+    print(f"real pairs: rewordings matched {pair_matches(REWORDED_PAIRS)}/{len(REWORDED_PAIRS)}, "
+          f"distinct-but-similar matched {pair_matches(DISTINCT_PAIRS)}/{len(DISTINCT_PAIRS)} (want 0)")
+
+    paper = [reword(rng, bank[i]) for i in rng.sample(range(args.bank), 10)]
+    paper += [make_question(rng, vocabulary) for _ in range(40)]
+    rng.shuffle(paper)
+    start = time.perf_counter()
+    kept = dedup.drop_near_duplicates(paper, index)
+    print(f"paper: 50 questions filtered against the bank in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms, {50 - len(kept)} dropped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Concurrent /api/export-pdf check and throughput.
+
+Fires N exports at once, each with its own distinct questions, and verifies
+that every returned PDF contains exactly the questions it was sent for.
+Exits non-zero on any mismatch.
+
+Usage (from backend/):
+    python benchmarks/bench_export.py --concurrency 32 --questions 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import fitz
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def paper(request_id: int, num_questions: int) -> list[dict]:
+    return [
+        {"question": f"Request {request_id} question {q}: explain topic R{request_id}Q{q}?",
+         "answer": f"Answer for R{request_id}Q{q}"}
+        for q in range(num_questions)
+    ]
+
+
+def pdf_text(content: bytes) -> str:
+    with fitz.open(stream=content, filetype="pdf") as doc:
+        return "\n".join(page.get_text() for page in doc)
+
+
+async def export(client: httpx.AsyncClient, request_id: int, num_questions: int) -> tuple[int, bool, float]:
+    start = time.perf_counter()
+    response = await client.post("/api/export-pdf", json={"questions": paper(request_id, num_questions)})
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200:
+        return request_id, False, elapsed
+
+    text = pdf_text(response.content)
+    own = all(f"R{request_id}Q{q}" in text for q in range(num_questions))
+    foreign = f"Request {request_id + 1} " in text or f"Request {request_id - 1} " in text
+    return request_id, own and not foreign, elapsed
+
+
+async def run(concurrency: int, num_questions: int) -> bool:
+    import main
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            start = time.perf_counter()
+            results = await asyncio.gather(*[export(client, i, num_questions) for i in range(concurrency)])
+            wall = time.perf_counter() - start
+
+    failures = [request_id for request_id, ok, _ in results if not ok]
+    latencies = sorted(elapsed for _, _, elapsed in results)
+    print(f"{concurrency} concurrent exports in {wall:.2f}s "
+          f"({concurrency / wall:.1f} req/s, p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, "
+          f"max {latencies[-1] * 1000:.0f} ms)")
+    if failures:
+        print(f"FAILED: responses for requests {failures} did not contain their own questions")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--questions", type=int, default=20)
+    args = parser.parse_args()
+    ok = asyncio.run(run(args.concurrency, args.questions))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
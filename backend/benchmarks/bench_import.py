@@ -0,0 +1,121 @@
+"""Cold-start cost: `-X importtime` of main.py and time to first /api/health.
+
+Each run is a fresh interpreter. Results can be appended to a JSON-lines file
+so startup cost is tracked across commits, and --max-import-ms turns the
+script into a regression gate.
+
+Usage (from backend/):
+    python benchmarks/bench_import.py --runs 5
+    python benchmarks/bench_import.py --record benchmarks/results/startup.jsonl --max-import-ms 800
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV = {**os.environ, "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "bench")}
+
+
+def import_times() -> dict[str, float]:
+    """Cumulative import time in ms of main and of each module it imports directly."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=ENV, capture_output=True, text=True, check=True,
+    )
+    # Output is post-order: a module's imports are listed before the module,
+    # each nesting level indented by two more spaces
+    children = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        ms = int(cumulative) / 1000
+        if depth == 1:
+            children[name.strip()] = ms
+        elif depth == 0:
+            if name.strip() == "main":
+                return {"main": ms, **children}
+            children = {}
+    raise RuntimeError("main not found in -X importtime output")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_health(timeout: float = 30) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=ENV, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError("server did not answer /api/health")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--record", help="append the result to this JSON-lines file")
+    parser.add_argument("--max-import-ms", type=float, help="fail if main imports slower than this")
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.runs)]
+    import_ms = statistics.median(r["main"] for r in runs)
+    health_ms = statistics.median(time_to_health() for _ in range(args.runs))
+
+    modules = {name: statistics.median(r.get(name, 0) for r in runs) for name in runs[0]}
+    heaviest = sorted(((ms, name) for name, ms in modules.items() if name != "main"), reverse=True)[:args.top]
+
+    print(f"import main: {import_ms:.0f} ms   time to first /api/health: {health_ms:.0f} ms")
+    for ms, name in heaviest:
+        print(f"  {ms:>8.1f} ms  {name}")
+
+    if args.record:
+        os.makedirs(os.path.dirname(os.path.abspath(args.record)), exist_ok=True)
+        with open(args.record, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "commit": git_commit(),
+                "import_ms": round(import_ms, 1),
+                "health_ms": round(health_ms, 1),
+                "heaviest": {name: round(ms, 1) for ms, name in heaviest},
+            }) + "\n")
+
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(f"FAIL: import main took {import_ms:.0f} ms (limit {args.max_import_ms:.0f} ms)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
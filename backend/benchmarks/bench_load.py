@@ -0,0 +1,408 @@
+"""Offline load test of every /api/* endpoint, with a local stand-in for Gemini.
+
+genai.GenerativeModel is replaced by a stub that answers after a configurable
+latency with canned responses shaped like Gemini's (question lists, mock-test
+lines, the question-paper JSON, answers, and streamed chunks), and Razorpay by
+a stub client, so no network or API key is needed. Each scenario fires
+--requests requests at --concurrency and reports requests/sec, p50/p95/p99
+latency and errors. Peak RSS covers the server process and its pool workers.
+
+Every request varies its prompt or upload bytes, so the generation and
+extraction caches miss as they would for distinct users. OCR scenarios
+(scanned PDF, JPEG) need tesseract and are skipped without it.
+
+--save writes the results as JSON; --baseline compares against a saved run
+and exits non-zero if any scenario's requests/sec falls, or its p95 or the
+peak RSS grows, by more than --tolerance.
+
+Usage (from backend/):
+    python benchmarks/bench_load.py --requests 50 --concurrency 10 --latency-ms 300
+    python benchmarks/bench_load.py --save benchmarks/results/load.json
+    python benchmarks/bench_load.py --baseline benchmarks/results/load.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import fitz
+import httpx
+
+from scanned_pages import save_pdf, scanned_pages
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+os.environ.setdefault("EXTRACTION_CACHE_DIR", tempfile.mkdtemp(prefix="qpg-bench-cache-"))
+# A fresh bank per run: the real one would collect the synthetic questions and serve later runs
+os.environ.setdefault("QUESTION_BANK_PATH", os.path.join(tempfile.mkdtemp(prefix="qpg-bench-bank-"), "bank.sqlite3"))
+# The stub has no quota; the client's rate limits would only measure themselves
+os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "1000000")
+os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "1000000000")
+
+SESSION = {"X-Session-Id": "loadtest"}
+
+
+# --- Gemini and Razorpay stand-ins ---
+class StubChunk:
+    def __init__(self, text: str):
+        self.text = text
+        self.parts = [text]
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+def stub_reply(prompt) -> str:
+    """A canned response in the shape the calling endpoint parses."""
+    if isinstance(prompt, list):  # question paper → JSON
+        text = prompt[-1]["parts"][0]["text"]
+        questions = [line.strip() for line in text.splitlines() if re.match(r"^\s*\d+\.", line)]
+        return json.dumps({"questions": questions or ["Explain the OSI model."]})
+    marks = re.search(r"generate (\d+) unique .*? for (\d+) marks", prompt)
+    if marks:
+        count, value = int(marks.group(1)), int(marks.group(2))
+        return "\n".join(f"{i + 1}. Describe topic {random.random():.6f} in detail ({value} marks)"
+                         for i in range(count))
+    if "question" in prompt.lower() and re.search(r"generate (\d+)", prompt):
+        count = int(re.search(r"generate (\d+)", prompt).group(1))
+        return "\n".join(f"{i + 1}. What is concept {random.random():.6f} of the topic?" for i in range(count))
+    return "The answer covers the definition, an example and the key properties. " * 4
+
+
+def stub_model(latency: float, jitter: float):
+    def delay() -> float:
+        return max(0.0, random.uniform(latency - jitter, latency + jitter))
+
+    class StubModel:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        async def generate_content_async(self, prompt, stream=False, **kwargs):
+            text = stub_reply(prompt)
+            if not stream:
+                await asyncio.sleep(delay())
+                return StubResponse(text)
+
+            async def chunks():
+                lines = text.split("\n")
+                for line in lines:
+                    await asyncio.sleep(delay() / len(lines))
+                    yield StubChunk(line + "\n")
+            return chunks()
+
+    return StubModel
+
+
+class StubRazorpay:
+    class order:
+        @staticmethod
+        def create(data):
+            return {"id": f"order_{random.randrange(10 ** 9)}", **data}
+
+
+# --- Fixtures ---
+def native_pdf(num_pages: int = 3) -> bytes:
+    doc = fitz.open()
+    for p in range(num_pages):
+        page = doc.new_page()
+        for line in range(20):
+            page.insert_text((72, 72 + line * 30), f"{line + 1}. Page {p + 1}: explain layer {line % 7 + 1} of the OSI model.")
+    return doc.tobytes()
+
+
+def syllabus_pdf() -> bytes:
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 72
+    for unit in range(1, 6):
+        page.insert_text((72, y), f"Unit {unit} Networking topic {unit}")
+        for line in range(5):
+            y += 18
+            page.insert_text((90, y), f"Subtopic {unit}.{line}: routing, switching, protocols and addressing.")
+        y += 30
+    return doc.tobytes()
+
+
+def scanned_pdf(num_pages: int = 3) -> bytes:
+    buffer = io.BytesIO()
+    save_pdf(buffer, scanned_pages(num_pages, lines=30))
+    return buffer.getvalue()
+
+
+def jpeg() -> bytes:
+    buffer = io.BytesIO()
+    scanned_pages(1, lines=30)[0].save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def unique(content: bytes, i: int) -> bytes:
+    # Trailing bytes after %%EOF / the JPEG end marker are ignored by readers
+    # but change the hash, so every upload misses the extraction cache
+    return content + f"\n% request {i} {random.random()}\n".encode()
+
+
+def has_tesseract() -> bool:
+    try:
+        import tesserocr  # noqa: F401
+        return True
+    except ImportError:
+        return shutil.which("tesseract") is not None
+
+
+# --- Scenarios ---
+def question_types(i: int) -> dict:
+    return {"numQuestions": 5, "mcq": i % 2 == 0, "shortAnswer": True, "longAnswer": False}
+
+
+def scenarios(fixtures: dict, ocr: bool) -> list[tuple[str, object]]:
+    """(name, async fn(client, i) -> response) in run order; syllabus upload comes first."""
+
+    async def upload(client, path, name, content, i, media="application/pdf"):
+        return await client.post(path, files={"file": (name, unique(content, i), media)}, headers=SESSION)
+
+    async def job(client, i):
+        response = await upload(client, "/api/upload-question-paper/jobs", "paper.pdf", fixtures["native"], i)
+        job_id = response.json()["job_id"]
+        while True:
+            status = await client.get(f"/api/jobs/{job_id}")
+            state = status.json()
+            if state["status"] == "failed":
+                raise RuntimeError(state["error"])
+            if state["status"] == "done":
+                return status
+            await asyncio.sleep(0.05)
+
+    async def job_events(client, i):
+        response = await upload(client, "/api/upload-question-paper/jobs", "paper.pdf", fixtures["native"], i)
+        # The stream ends with the job's terminal state as the event name
+        events = await client.get(f"/api/jobs/{response.json()['job_id']}/events")
+        if "event: done" not in events.text:
+            raise RuntimeError(events.text[-200:])
+        return events
+
+    def chapters(i: int) -> dict:
+        return {"chapters": [{"chapter": f"Unit {(i + k) % 5 + 1}", **question_types(i + k)} for k in range(3)]}
+
+    async def by_chapters(client, i):
+        response = await client.post("/api/nlp-generate-questions-by-chapters", json=chapters(i), headers=SESSION)
+        failed = [r for r in response.json().get("results", []) if "error" in r]
+        if failed:
+            raise RuntimeError(failed)
+        return response
+
+    async def by_chapters_stream(client, i):
+        response = await client.post("/api/nlp-generate-questions-by-chapters/stream", json=chapters(i), headers=SESSION)
+        if "event: error" in response.text or "event: done" not in response.text:
+            raise RuntimeError(response.text[-200:])
+        return response
+
+    items = [
+        ("upload-syllabus", lambda c, i: upload(c, "/api/upload-syllabus", "syllabus.pdf", fixtures["syllabus"], i)),
+        ("health", lambda c, i: c.get("/api/health")),
+        ("cache-stats", lambda c, i: c.get("/api/cache-stats")),
+        ("register-user", lambda c, i: c.post("/api/register-user", json={"username": f"u{i}", "email": f"u{i}@example.com"})),
+        ("create-order", lambda c, i: c.post("/api/create-order", json={"amount": 99, "user_email": f"u{i}@example.com"})),
+        ("generate-questions", lambda c, i: c.post("/api/nlp-generate-questions", json={"text": f"Topic {i}: the OSI model.", **question_types(i)})),
+        ("generate-questions-stream", lambda c, i: c.post("/api/nlp-generate-questions/stream", json={"text": f"Topic {i}: TCP.", **question_types(i)})),
+        ("generate-answer", lambda c, i: c.post("/api/generate-answer", json={"question": f"What is layer {i}?"})),
+        ("generate-answers", lambda c, i: c.post("/api/generate-answers", json={"items": [{"question": f"Q{i}.{k}?"} for k in range(10)]})),
+        ("by-chapter", lambda c, i: c.post("/api/nlp-generate-questions-by-chapter", json={"chapter": f"Unit {i % 5 + 1}", **question_types(i)}, headers=SESSION)),
+        ("by-chapter-stream", lambda c, i: c.post("/api/nlp-generate-questions-by-chapter/stream", json={"chapter": f"Unit {i % 5 + 1}", **question_types(i + 1)}, headers=SESSION)),
+        ("by-chapters", by_chapters),
+        ("by-chapters-stream", by_chapters_stream),
+        ("question-bank-search", lambda c, i: c.get("/api/question-bank/search", params={"q": "concept", "chapter": f"unit {i % 5 + 1}"})),
+        ("answer-to-question", lambda c, i: c.post("/api/nlp-generate-answer-to-question", json={"question": f"Explain routing {i}"}, headers=SESSION)),
+        ("upload-paper-native", lambda c, i: upload(c, "/api/upload-question-paper", "paper.pdf", fixtures["native"], i)),
+        ("upload-paper-job", job),
+        ("upload-paper-job-events", job_events),
+        ("export-pdf", lambda c, i: c.post("/api/export-pdf", json={"questions": [{"question": f"Q{i}.{k}: explain?", "answer": "A) x\nB) y"} for k in range(20)]})),
+        ("export-mocktest", lambda c, i: c.post("/api/export-mocktestpaper", json={"mocktestRequests": [{"numQuestions": 5, "marks": 2}, {"numQuestions": 3, "marks": 5}]}, headers=SESSION)),
+    ]
+    if ocr:
+        items += [
+            ("upload-paper-scanned", lambda c, i: upload(c, "/api/upload-question-paper", "scan.pdf", fixtures["scanned"], i)),
+            ("upload-paper-jpeg", lambda c, i: upload(c, "/api/upload-question-paper", "paper.jpg", fixtures["jpeg"], i, "image/jpeg")),
+        ]
+    items.append(("metrics", lambda c, i: c.get("/api/metrics")))
+    return items
+
+
+# --- Measurement ---
+def rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def child_pids(pid: int) -> list[int]:
+    children = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        children.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    return children
+
+
+class PeakRss(threading.Thread):
+    """Samples the RSS of this process plus its children (the pool workers)."""
+
+    def __init__(self, interval: float = 0.1):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        pid = os.getpid()
+        while not self._stop_event.is_set():
+            total = rss_bytes(pid) + sum(rss_bytes(child) for child in child_pids(pid))
+            self.peak = max(self.peak, total)
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+async def run_scenario(client, fn, requests: int, concurrency: int) -> dict:
+    # One unmeasured request first, so pool start-up and lazy imports aren't counted
+    await fn(client, requests)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await fn(client, i)
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(requests)])
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": round(requests / wall, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "errors": errors,
+    }
+
+
+async def run(args) -> dict:
+    import llm
+    import main
+
+    random.seed(args.seed)
+    llm.get_genai().GenerativeModel = stub_model(args.latency_ms / 1000, args.jitter_ms / 1000)
+    main._razorpay_client = StubRazorpay()
+
+    ocr = has_tesseract()
+    fixtures = {"native": native_pdf(), "syllabus": syllabus_pdf(), "scanned": scanned_pdf(), "jpeg": jpeg()}
+    selected = [(name, fn) for name, fn in scenarios(fixtures, ocr)
+                if not args.only or name in args.only or name == "upload-syllabus"]
+
+    sampler = PeakRss()
+    sampler.start()
+    results = {}
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            print(f"{'scenario':<28} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+            for name, fn in selected:
+                result = await run_scenario(client, fn, args.requests, args.concurrency)
+                results[name] = result
+                print(f"{name:<28} {result['rps']:>8.1f} {result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f} "
+                      f"{result['p99_ms']:>8.0f} {result['errors']:>7}")
+    peak_mb = round(sampler.stop() / 2 ** 20, 1)
+    if not ocr:
+        print("(scanned PDF and JPEG scenarios skipped: tesseract not installed)")
+    print(f"peak RSS (server + workers): {peak_mb} MB")
+    return {
+        "config": {"requests": args.requests, "concurrency": args.concurrency,
+                   "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms},
+        "scenarios": results,
+        "peak_rss_mb": peak_mb,
+    }
+
+
+def regressions(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    problems = []
+    for name, base in baseline["scenarios"].items():
+        now = current["scenarios"].get(name)
+        if now is None:
+            continue
+        if now["rps"] < base["rps"] * (1 - tolerance):
+            problems.append(f"{name}: {now['rps']} req/s, baseline {base['rps']}")
+        if now["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            problems.append(f"{name}: p95 {now['p95_ms']} ms, baseline {base['p95_ms']}")
+        if now["errors"] > base["errors"]:
+            problems.append(f"{name}: {now['errors']} errors, baseline {base['errors']}")
+    if current["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        problems.append(f"peak RSS {current['peak_rss_mb']} MB, baseline {baseline['peak_rss_mb']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=300, help="stub Gemini latency")
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", help="run only these scenarios")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="fail on regressions against this saved JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = regressions(results, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
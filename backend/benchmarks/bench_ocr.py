@@ -0,0 +1,80 @@
+"""Page-parallel OCR speedup versus page count.
+
+Builds synthetic scanned PDFs (image-only pages, no text layer) and times
+ocr_pdf_pages with one worker against --workers workers (default: every core,
+one document with the machine to itself), and against the server's own path,
+extract_pdf in main.py, which spreads the pages over the process pool with
+its default CPU_WORKERS.
+
+Usage (from backend/, needs tesseract installed; pages are rasterized with PyMuPDF):
+    python benchmarks/bench_ocr.py --pages 1 4 8 16 40 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from executor import CPU_WORKERS, shutdown_pools  # noqa: E402
+from extraction import ocr_pdf_pages  # noqa: E402
+from main import extract_pdf  # noqa: E402
+from scanned_pages import save_pdf, scanned_pages  # noqa: E402
+
+DPI = 150
+
+
+def make_scanned_pdf(path: str, num_pages: int):
+    save_pdf(path, scanned_pages(num_pages, dpi=DPI), DPI)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+async def server_timed(path: str) -> float:
+    start = time.perf_counter()
+    await extract_pdf(path)
+    return time.perf_counter() - start
+
+
+async def warm_up_pool(tmp: str):
+    # Start the spawned workers before timing anything
+    path = os.path.join(tmp, "warm.pdf")
+    make_scanned_pdf(path, CPU_WORKERS)
+    await extract_pdf(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+async def run(args):
+    print(f"server: CPU_WORKERS={CPU_WORKERS}")
+    print(f"{'pages':>6} {'serial s':>10} {'parallel s':>11} {'speedup':>8} {'server s':>9} {'speedup':>8}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            await warm_up_pool(tmp)
+            for n in args.pages:
+                path = os.path.join(tmp, f"scan-{n}.pdf")
+                make_scanned_pdf(path, n)
+                serial = timed(ocr_pdf_pages, path, 1)
+                parallel = timed(ocr_pdf_pages, path, args.workers)
+                server = await server_timed(path)
+                print(f"{n:>6} {serial:>10.2f} {parallel:>11.2f} {serial / parallel:>7.2f}x "
+                      f"{server:>9.2f} {serial / server:>7.2f}x")
+    finally:
+        shutdown_pools()
+
+
+if __name__ == "__main__":
+    main()
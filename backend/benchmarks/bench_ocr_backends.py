@@ -0,0 +1,51 @@
+"""Per-page OCR latency: pytesseract (process per page) against tesserocr (warm engine).
+
+OCRs the same synthetic pages with each installed backend, one page at a
+time, and reports the first page (cold: includes engine start-up) separately
+from the median and p95 of the rest.
+
+Usage (from backend/, needs tesseract; tesserocr is skipped if not installed):
+    python benchmarks/bench_ocr_backends.py --pages 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr import BACKENDS  # noqa: E402
+from scanned_pages import scanned_pages  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = scanned_pages(max(2, args.pages))
+    print(f"{'backend':<12} {'cold ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'pages/s':>8}")
+    for name, backend_class in BACKENDS.items():
+        start = time.perf_counter()
+        try:
+            backend = backend_class()
+            backend.recognize(pages[0])
+        except Exception as e:
+            print(f"{name:<12} unavailable: {e}")
+            continue
+        cold = time.perf_counter() - start
+
+        latencies = []
+        for page in pages[1:]:
+            start = time.perf_counter()
+            backend.recognize(page)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{name:<12} {cold * 1000:>9.0f} {statistics.median(latencies) * 1000:>8.0f} "
+              f"{p95 * 1000:>8.0f} {len(latencies) / sum(latencies):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
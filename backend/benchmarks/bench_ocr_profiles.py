@@ -0,0 +1,129 @@
+"""OCR accuracy versus time: fixed 300 DPI + contrast against the adaptive pipeline.
+
+Runs every fixture through extract_text_from_pdf / extract_text_from_image
+twice: once with the old fixed settings (300 DPI, "contrast" profile, images
+at full resolution) and once with the adaptive defaults. Accuracy is the
+character similarity to the ground truth (1.0 = identical). Exits non-zero
+if adaptive accuracy drops by more than --max-accuracy-drop.
+
+Fixtures are generated (clean scan, large print, faint scan, phone photo);
+--fixtures adds real files, each with its ground truth in a sibling .txt.
+
+Usage (from backend/, needs tesseract installed):
+    python benchmarks/bench_ocr_profiles.py
+    python benchmarks/bench_ocr_profiles.py --fixtures ~/scans --max-accuracy-drop 0.01
+"""
+import argparse
+import difflib
+import glob
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageFilter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import extraction  # noqa: E402
+from scanned_pages import draw_page, page_lines, save_pdf  # noqa: E402
+
+BASELINE = {"OCR_MIN_DPI": 300, "OCR_MAX_DPI": 300, "OCR_PROFILE": "contrast", "OCR_TARGET_LINE_PX": 10 ** 6}
+ADAPTIVE = {name: getattr(extraction, name) for name in BASELINE}
+
+
+def shade(img: Image.Image) -> Image.Image:
+    """Uneven lighting and a little blur, like a phone photo of a page."""
+    gradient = Image.linear_gradient("L").resize(img.size).point(lambda v: v // 3)
+    return Image.blend(img, gradient, 0.35).filter(ImageFilter.GaussianBlur(1))
+
+
+def make_fixtures(directory: str, pages: int) -> list[tuple[str, str]]:
+    fixtures = []
+
+    def pdf(name, images, dpi, lines):
+        path = os.path.join(directory, name)
+        save_pdf(path, images, dpi)
+        fixtures.append((path, "\n".join(lines)))
+
+    clean = [page_lines(p, 30) for p in range(pages)]
+    pdf("clean_300dpi.pdf", [draw_page(lines, 300, 11) for lines in clean], 300, sum(clean, []))
+    large = [page_lines(p, 18) for p in range(pages)]
+    pdf("large_print_300dpi.pdf", [draw_page(lines, 300, 18) for lines in large], 300, sum(large, []))
+    pdf("faint_200dpi.pdf", [draw_page(lines, 200, 11, paper=200, ink=150) for lines in clean], 200,
+        sum(clean, []))
+
+    photo_lines = page_lines(0, 30)
+    photo = shade(draw_page(photo_lines, 480, 11, paper=235, ink=40))
+    path = os.path.join(directory, "phone_photo.jpg")
+    photo.convert("RGB").save(path, quality=88)
+    fixtures.append((path, "\n".join(photo_lines)))
+    return fixtures
+
+
+def real_fixtures(directory: str) -> list[tuple[str, str]]:
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, "*"))):
+        truth = os.path.splitext(path)[0] + ".txt"
+        if path.lower().endswith((".pdf", ".jpg", ".jpeg")) and os.path.exists(truth):
+            with open(truth, encoding="utf-8") as f:
+                fixtures.append((path, f.read()))
+    return fixtures
+
+
+def accuracy(truth: str, text: str) -> float:
+    return difflib.SequenceMatcher(None, " ".join(truth.split()), " ".join(text.split()), autojunk=False).ratio()
+
+
+def run(path: str, settings: dict, runs: int) -> tuple[float, float]:
+    for name, value in settings.items():
+        setattr(extraction, name, value)
+    extract = extraction.extract_text_from_pdf if path.lower().endswith(".pdf") else extraction.extract_text_from_image
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = extract(path)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), text
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=2, help="pages per generated PDF")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--fixtures", help="directory of real scans with .txt ground truth")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.02)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = make_fixtures(tmp, args.pages)
+        if args.fixtures:
+            fixtures += real_fixtures(args.fixtures)
+
+        totals = {"fixed": [0.0, []], "adaptive": [0.0, []]}
+        print(f"{'fixture':<26} {'fixed s':>8} {'acc':>6} {'adaptive s':>11} {'acc':>6} {'speedup':>8}")
+        for path, truth in fixtures:
+            row = {}
+            for mode, settings in (("fixed", BASELINE), ("adaptive", ADAPTIVE)):
+                seconds, text = run(path, settings, args.runs)
+                row[mode] = (seconds, accuracy(truth, text))
+                totals[mode][0] += seconds
+                totals[mode][1].append(row[mode][1])
+            (fixed_s, fixed_acc), (adaptive_s, adaptive_acc) = row["fixed"], row["adaptive"]
+            print(f"{os.path.basename(path):<26} {fixed_s:>8.2f} {fixed_acc:>6.3f} "
+                  f"{adaptive_s:>11.2f} {adaptive_acc:>6.3f} {fixed_s / adaptive_s:>7.2f}x")
+
+    fixed_acc, adaptive_acc = (statistics.mean(totals[mode][1]) for mode in ("fixed", "adaptive"))
+    print(f"{'total':<26} {totals['fixed'][0]:>8.2f} {fixed_acc:>6.3f} "
+          f"{totals['adaptive'][0]:>11.2f} {adaptive_acc:>6.3f} "
+          f"{totals['fixed'][0] / totals['adaptive'][0]:>7.2f}x")
+
+    if fixed_acc - adaptive_acc > args.max_accuracy_drop:
+        print(f"FAIL: adaptive accuracy {adaptive_acc:.3f} is more than "
+              f"{args.max_accuracy_drop} below fixed {fixed_acc:.3f}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Render time for question and mock test papers of 10, 100 and 1000 questions.
+
+Also reports the one-off style sheet build that used to be paid per request.
+
+Usage (from backend/):
+    python benchmarks/bench_paper.py --sizes 10 100 1000 --runs 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from paper import build_mock_test_paper, build_question_paper, build_styles  # noqa: E402
+
+
+def questions(n: int) -> list[dict]:
+    return [
+        {"question": f"Explain the role of layer {i % 7 + 1} in the OSI model?",
+         "marks": 5,
+         "answer": "A) Framing\nB) Routing\nC) Encoding"}
+        for i in range(n)
+    ]
+
+
+def grouped(n: int) -> dict[int, list[dict]]:
+    marks = [1, 2, 5, 8]
+    return {m: [{"question": f"Question {i} for {m} marks", "marks": m} for i in range(n // len(marks))]
+            for m in marks}
+
+
+def best_of(runs: int, fn, *args) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"style sheet build (once per process): {best_of(args.runs, build_styles):.2f} ms")
+    print(f"{'questions':>10} {'paper ms':>10} {'mock ms':>10}")
+    for n in args.sizes:
+        paper_ms = best_of(args.runs, build_question_paper, questions(n))
+        mock_ms = best_of(args.runs, build_mock_test_paper, grouped(n))
+        print(f"{n:>10} {paper_ms:>10.1f} {mock_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Prompt size before and after compaction.
+
+Builds a synthetic OCR'd syllabus (running headers and footers on every page,
+page numbers, scanner specks, ligatures, zero-width characters, words
+hyphenated across lines, runs of spaces) and a pasted text of similar shape,
+then compares the source-text tokens each endpoint sent before compaction with
+what it sends now:
+
+  text      the pasted text (it used to go into the prompt twice)
+  chapter   one unit of the syllabus
+  mock      the whole syllabus, once per marks section
+  answer    the retrieved syllabus context
+
+Tokens are estimated as the Gemini client meters them (~4 characters each);
+cost is input tokens at --usd-per-million. Gemini latency grows with prompt
+size but can't be measured offline, so only the compaction time is timed.
+
+Usage (from backend/):
+    python benchmarks/bench_prompt_budget.py --pages 120 --sections 3
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compaction  # noqa: E402
+from llm import estimate_tokens  # noqa: E402
+from syllabus import SyllabusIndex  # noqa: E402
+
+TERMS = ["process", "scheduling", "memory", "paging", "segmentation", "deadlock", "semaphore", "thread",
+         "file system", "inode", "virtual memory", "interrupt", "kernel", "cache", "protocol", "routing",
+         "normalization", "transaction", "concurrency", "indexing", "recursion", "complexity", "graph"]
+NOISE = ["~", "' .", "| |", "_ _ _", "-", "• •", ",,", "·"]
+# What OCR and PDF copy-paste leave behind
+GARBLE = [("fi", "ﬁ"), ("fl", "ﬂ"), (" ", "  "), ("e", "e\u200b")]
+
+
+def make_sentence(rng: random.Random) -> str:
+    words = [rng.choice(TERMS) for _ in range(rng.randint(6, 14))]
+    return f"The {' and '.join(words[:2])} of {' '.join(words[2:])} is defined and its efficiency discussed."
+
+
+def garble(rng: random.Random, line: str) -> str:
+    for plain, ocr in GARBLE:
+        if plain in line and rng.random() < 0.3:
+            line = line.replace(plain, ocr, 1)
+    words = line.split(" ")
+    if len(words) > 6 and rng.random() < 0.3:
+        # Hyphenated at the line end
+        i = rng.randrange(2, len(words) - 2)
+        if len(words[i]) > 5:
+            words[i] = words[i][:3] + "-\n" + words[i][3:]
+    return " ".join(words)
+
+
+def make_document(rng: random.Random, pages: int, units: int, header: str) -> str:
+    lines = []
+    for page in range(1, pages + 1):
+        lines += [header, ""]
+        if (page - 1) % max(1, pages // units) == 0 and (page - 1) // max(1, pages // units) < units:
+            lines += [f"UNIT {(page - 1) // max(1, pages // units) + 1}: {rng.choice(TERMS).title()}", ""]
+        for _ in range(rng.randint(3, 5)):
+            lines.append(" ".join(garble(rng, make_sentence(rng)) for _ in range(rng.randint(2, 4))))
+            if rng.random() < 0.4:
+                lines.append(rng.choice(NOISE))
+            lines.append("")
+        lines += ["Department of Computer Science - Confidential", f"Page {page} of {pages}", "\f"]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=120, help="syllabus pages")
+    parser.add_argument("--paste-pages", type=int, default=25, help="pages of pasted text")
+    parser.add_argument("--units", type=int, default=5)
+    parser.add_argument("--sections", type=int, default=3, help="marks sections in a mock test")
+    parser.add_argument("--usd-per-million", type=float, default=0.075, help="input price (flash default)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    raw_syllabus = make_document(rng, args.pages, args.units, "B.Tech Semester V - Operating Systems")
+    pasted = make_document(rng, args.paste_pages, 1, "Lecture Notes")
+
+    start = time.perf_counter()
+    syllabus_text = compaction.normalize_text(raw_syllabus)
+    normalize_ms = (time.perf_counter() - start) * 1000
+    raw_index, index = SyllabusIndex(raw_syllabus), SyllabusIndex(syllabus_text)
+    question = f"Explain {rng.choice(TERMS)} and {rng.choice(TERMS)}"
+
+    cases = []
+    start = time.perf_counter()
+    after = compaction.fit_to_budget(compaction.normalize_text(pasted), compaction.PROMPT_BUDGET_TEXT)
+    cases.append(("text", 2 * estimate_tokens(pasted), estimate_tokens(after), time.perf_counter() - start))
+
+    chapter = raw_index.chapter("UNIT 1") or ""
+    start = time.perf_counter()
+    after = compaction.fit_to_budget(index.chapter("UNIT 1") or "", compaction.PROMPT_BUDGET_CHAPTER)
+    cases.append(("chapter", estimate_tokens(chapter), estimate_tokens(after), time.perf_counter() - start))
+
+    start = time.perf_counter()
+    after = compaction.fit_to_budget(syllabus_text, compaction.PROMPT_BUDGET_MOCK)
+    cases.append(("mock", args.sections * estimate_tokens(raw_syllabus), args.sections * estimate_tokens(after),
+                  time.perf_counter() - start))
+
+    start = time.perf_counter()
+    after = compaction.fit_to_budget(index.context_for(question), compaction.PROMPT_BUDGET_ANSWER)
+    cases.append(("answer", estimate_tokens(raw_index.context_for(question)), estimate_tokens(after),
+                  time.perf_counter() - start))
+
+    print(f"syllabus: {len(raw_syllabus):,} chars, normalized once at upload in {normalize_ms:.1f} ms "
+          f"({estimate_tokens(raw_syllabus):,} -> {estimate_tokens(syllabus_text):,} tokens)")
+    print(f"{'endpoint':<10}{'before':>10}{'after':>10}{'saved':>8}{'$/1k before':>14}{'$/1k after':>12}"
+          f"{'compact ms':>12}")
+    price = args.usd_per_million / 1e6 * 1000  # per 1000 requests
+    for name, before, now, seconds in cases:
+        saved = 1 - now / before if before else 0
+        print(f"{name:<10}{before:>10,}{now:>10,}{saved:>8.0%}{before * price:>14.2f}{now * price:>12.2f}"
+              f"{seconds * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Answer prompt size and latency: full syllabus versus BM25 top-k chunks.
+
+Prompt tokens are estimated at ~4 characters per token. Without --live only
+the local cost (retrieval time, prompt size) is measured; with --live each
+prompt is also sent to Gemini and the round trip is timed.
+
+Usage (from backend/):
+    python benchmarks/bench_retrieval.py --syllabus syllabus.txt --repeat 20
+    GOOGLE_API_KEY=... python benchmarks/bench_retrieval.py --live
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retrieval import RETRIEVAL_TOP_K  # noqa: E402
+from syllabus import SyllabusIndex  # noqa: E402
+
+SYSTEM_PROMPT = (
+    "You are an expert academic assistant. Using the provided syllabus content, "
+    "answer the user's question clearly, concisely, and accurately. "
+    "Only answer if relevant information is found. If not found, say 'Information not found in syllabus.'"
+)
+
+QUESTIONS = [
+    "What is the difference between simplex and full-duplex communication?",
+    "Explain the OSI model layers.",
+    "What does jitter mean in data communication?",
+    "Compare LAN, WAN and MAN.",
+    "What is a protocol?",
+]
+
+
+def build_prompt(context: str, question: str) -> str:
+    return SYSTEM_PROMPT + f"\n\nSyllabus content:\n\n{context}\n\nUser question: {question}"
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def call_gemini(prompt: str) -> float:
+    import google.generativeai as genai
+    genai.configure(api_key=os.environ.get("GOOGLE_API_KEY"))
+    model = genai.GenerativeModel("gemini-1.5-flash")
+    start = time.perf_counter()
+    model.generate_content(prompt, generation_config=genai.types.GenerationConfig(temperature=0.3, max_output_tokens=400))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--syllabus", default="syllabus.txt")
+    parser.add_argument("--repeat", type=int, default=20, help="copies of the syllabus to simulate a large one")
+    parser.add_argument("--k", type=int, default=RETRIEVAL_TOP_K)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.syllabus, encoding="utf-8") as f:
+        base = f.read()
+    text = "\n".join(f"Unit {i + 1}\n{base}" for i in range(args.repeat))
+
+    start = time.perf_counter()
+    index = SyllabusIndex(text)
+    print(f"index build: {(time.perf_counter() - start) * 1000:.1f} ms, "
+          f"{len(index.retriever.chunks)} chunks, ~{estimate_tokens(text)} syllabus tokens")
+
+    full_tokens, rag_tokens, retrieve_ms, full_s, rag_s = [], [], [], [], []
+    for question in QUESTIONS:
+        start = time.perf_counter()
+        context = index.context_for(question, args.k)
+        retrieve_ms.append((time.perf_counter() - start) * 1000)
+
+        full_prompt = build_prompt(text, question)
+        rag_prompt = build_prompt(context, question)
+        full_tokens.append(estimate_tokens(full_prompt))
+        rag_tokens.append(estimate_tokens(rag_prompt))
+        if args.live:
+            full_s.append(call_gemini(full_prompt))
+            rag_s.append(call_gemini(rag_prompt))
+
+    print(f"{'':>10} {'tokens':>10} {'latency s':>10}")
+    print(f"{'full':>10} {statistics.mean(full_tokens):>10.0f} "
+          f"{statistics.mean(full_s) if full_s else float('nan'):>10.2f}")
+    print(f"{'top-' + str(args.k):>10} {statistics.mean(rag_tokens):>10.0f} "
+          f"{statistics.mean(rag_s) if rag_s else float('nan'):>10.2f}")
+    print(f"retrieval: {statistics.mean(retrieve_ms):.2f} ms/query, "
+          f"prompt reduction {statistics.mean(full_tokens) / statistics.mean(rag_tokens):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
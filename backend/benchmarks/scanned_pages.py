@@ -0,0 +1,34 @@
+"""Synthetic scanned pages shared by the OCR benchmarks.
+
+Each page is typed text on a blank A4 image with no text layer, like the
+output of a flatbed scanner. Import from a benchmark script, which has
+benchmarks/ on sys.path when it is run directly.
+"""
+from PIL import Image, ImageDraw, ImageFont
+
+A4_INCHES = (8.27, 11.69)
+
+
+def page_lines(page: int, count: int) -> list[str]:
+    return [f"{line + 1}. Page {page + 1}: explain layer {line % 7 + 1} of the OSI model and its protocols."
+            for line in range(count)]
+
+
+def draw_page(lines: list[str], dpi: int = 200, font_pt: float = 11, paper: int = 255, ink: int = 0) -> Image.Image:
+    size = (round(A4_INCHES[0] * dpi), round(A4_INCHES[1] * dpi))
+    img = Image.new("L", size, paper)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=round(font_pt * dpi / 72))
+    step = round(font_pt * 1.6 * dpi / 72)
+    for i, line in enumerate(lines):
+        draw.text((dpi // 2, dpi // 2 + i * step), line, fill=ink, font=font)
+    return img
+
+
+def scanned_pages(num_pages: int, lines: int = 40, dpi: int = 200) -> list[Image.Image]:
+    return [draw_page(page_lines(p, lines), dpi) for p in range(num_pages)]
+
+
+def save_pdf(target, pages: list[Image.Image], dpi: int = 200):
+    """Write the pages as an image-only PDF to a path or a binary file."""
+    pages[0].save(target, "PDF", save_all=True, append_images=pages[1:], resolution=dpi)
@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# --- Extraction Cache ---
+# Uploaded files are addressed by a hash of their bytes plus the extraction
+# settings, so re-uploading the same syllabus or paper skips fitz/OCR and the
+# Gemini parse. Entries are small JSON files; the least recently used ones are
+# evicted once the directory grows past its size limit.
+EXTRACTION_CACHE_DIR = os.environ.get(
+    "EXTRACTION_CACHE_DIR", os.path.join(tempfile.gettempdir(), "qpg-extraction-cache")
+)
+EXTRACTION_CACHE_MAX_BYTES = int(os.environ.get("EXTRACTION_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+class ExtractionCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(file_hash: str, settings: dict) -> str:
+        digest = hashlib.sha256(file_hash.encode())
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> dict | None:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, **fields):
+        """Merge ``fields`` into the entry for ``key`` and enforce the size limit."""
+        with self._lock:
+            path = self._path(key)
+            entry = {}
+            try:
+                with open(path, encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+            entry.update(fields)
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+
+        entries.sort()
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+extraction_cache = ExtractionCache(EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_BYTES)
+
+
+# --- Generation Cache ---
+# Identical prompts (same model and generation config) share one Gemini call:
+# finished responses are kept for a TTL in an LRU map, and concurrent requests
+# for a prompt that is still in flight await the same upstream call.
+GENERATION_CACHE_SIZE = int(os.environ.get("GENERATION_CACHE_SIZE", 1024))
+GENERATION_CACHE_TTL = float(os.environ.get("GENERATION_CACHE_TTL", 3600))
+
+
+class GenerationCache:
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._inflight: dict[str, list] = {}
+
+    @staticmethod
+    def key(model: str, prompt: str, config: dict) -> str:
+        normalized = " ".join(prompt.split())
+        return hashlib.sha256(json.dumps([model, normalized, config], sort_keys=True).encode()).hexdigest()
+
+    async def get_or_generate(self, key: str, generate) -> str:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+        else:
+            # The upstream call runs as its own task, so a request that gets
+            # cancelled only stops waiting; the call goes on for the others
+            self.misses += 1
+            inflight = [None, 0]  # [task, requests waiting on it]
+            inflight[0] = asyncio.create_task(self._generate(key, generate, inflight))
+            self._inflight[key] = inflight
+        task = inflight[0]
+        inflight[1] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            inflight[1] -= 1
+            if inflight[1] == 0 and not task.done():
+                # Nobody is waiting any more: drop the call, and let the next
+                # request for this prompt start a fresh one
+                task.cancel()
+                if self._inflight.get(key) is inflight:
+                    del self._inflight[key]
+
+    async def _generate(self, key: str, generate, inflight: list) -> str:
+        try:
+            value = await generate()
+        finally:
+            if self._inflight.get(key) is inflight:
+                del self._inflight[key]
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "entries": len(self._entries),
+        }
+
+
+generation_cache = GenerationCache(GENERATION_CACHE_SIZE, GENERATION_CACHE_TTL)
@@ -0,0 +1,116 @@
+import os
+import re
+import unicodedata
+from collections import Counter
+
+from llm import estimate_tokens
+from metrics import timed
+
+# --- Prompt Compaction ---
+# Source text reaches prompts as OCR or copy-paste left it: ligatures and
+# zero-width characters, runs of spaces, words hyphenated across lines, page
+# numbers, running headers and footers repeated on every page, and lines of
+# scanner noise. normalize_text() removes those (the syllabus once at upload,
+# pasted text per request). fit_to_budget() then caps each endpoint's source
+# text at a token budget: every section keeps its opening lines, in
+# proportion to its size, so the whole document stays represented and the
+# same input always gives the same prompt.
+PROMPT_BUDGET_TEXT = int(os.environ.get("PROMPT_BUDGET_TEXT", 8000))
+PROMPT_BUDGET_CHAPTER = int(os.environ.get("PROMPT_BUDGET_CHAPTER", 6000))
+PROMPT_BUDGET_MOCK = int(os.environ.get("PROMPT_BUDGET_MOCK", 12000))
+PROMPT_BUDGET_ANSWER = int(os.environ.get("PROMPT_BUDGET_ANSWER", 4000))
+
+# Lines (case- and space-insensitive) seen this often are running headers/footers
+REPEATED_LINE_MIN_COUNT = 3
+REPEATED_LINE_MAX_CHARS = 100
+# Lines longer than this are split at sentence ends before budgeting
+SEGMENT_MAX_CHARS = 400
+
+INVISIBLE = re.compile(r"[\u00ad\u200b-\u200f\u2060\ufeff]")  # soft hyphens, zero-width marks
+CONTROL = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]")
+HYPHENATED_BREAK = re.compile(r"(?<=[a-z])-\n(?=[a-z])")
+PAGE_NUMBER_LINE = re.compile(r"^(?:page\s*)?[\-\u2013\u2014(\[]?\s*\d{1,4}\s*(?:(?:of|/)\s*\d{1,4})?\s*[\-\u2013\u2014)\]]?$",
+                              re.IGNORECASE)
+UNIT_LINE = re.compile(r"unit[\s\-]*\d+", re.IGNORECASE)
+SENTENCE_END = re.compile(r"(?<=[.?!;])\s+")
+WORD = re.compile(r"[^\W_]{2,}")
+CODE_PUNCTUATION = re.compile(r"[{}()\[\]=<>+*/]")
+
+
+def is_noise(line: str) -> bool:
+    """Scanner specks, rules and stray bullets: no word, and nothing that could be code."""
+    return not WORD.search(line) and not CODE_PUNCTUATION.search(line)
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).replace("\r\n", "\n").replace("\r", "\n")
+    text = CONTROL.sub(" ", INVISIBLE.sub("", text))
+    text = HYPHENATED_BREAK.sub("", text)
+    lines = [" ".join(line.split()) for line in text.split("\n")]
+
+    # Running headers and footers: keep the first occurrence. Unit headings
+    # are never dropped, the syllabus index splits chapters on them
+    counts = Counter(line.lower() for line in lines if line and len(line) <= REPEATED_LINE_MAX_CHARS)
+    repeated = {line for line, n in counts.items() if n >= REPEATED_LINE_MIN_COUNT and not UNIT_LINE.search(line)}
+    seen = set()
+    kept = []
+    for line in lines:
+        key = line.lower()
+        if line and (PAGE_NUMBER_LINE.match(line) or is_noise(line)):
+            continue
+        if key in repeated:
+            if key in seen:
+                continue
+            seen.add(key)
+        if line or (kept and kept[-1]):  # at most one blank line in a row
+            kept.append(line)
+    return "\n".join(kept).strip()
+
+
+def fit_to_budget(text: str, max_tokens: int) -> str:
+    """``text`` cut to about ``max_tokens``, keeping the head of every section."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    sections = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        segments = []
+        for line in paragraph.split("\n"):
+            segments += SENTENCE_END.split(line) if len(line) > SEGMENT_MAX_CHARS else [line]
+        sections.append([s for s in segments if s.strip()])
+    if len(sections) == 1:
+        # No paragraph breaks: budget eight even stretches instead
+        segments = sections[0]
+        step = -(-len(segments) // 8)
+        sections = [segments[i:i + step] for i in range(0, len(segments), step)]
+
+    total = sum(estimate_tokens(s) for section in sections for s in section)
+    kept_sections = []
+    carry = 0  # budget a section didn't use goes to the next
+    for section in sections:
+        share = max_tokens * sum(estimate_tokens(s) for s in section) // total + carry
+        kept, used = [], 0
+        for segment in section:
+            cost = estimate_tokens(segment)
+            if used + cost > share:
+                if not kept and share > 0:
+                    # Not even the first line fits: keep its first words
+                    kept.append(segment[:share * 4].rsplit(" ", 1)[0])
+                    used = share
+                break
+            kept.append(segment)
+            used += cost
+        carry = share - used
+        if kept:
+            kept_sections.append("\n".join(kept))
+    return "\n\n".join(kept_sections)
+
+
+def compact(text: str, max_tokens: int, pipeline: str, normalize: bool = True) -> str:
+    """Normalized (unless already done) and budgeted source text for a prompt."""
+    with timed(pipeline, "compact") as stage:
+        if normalize:
+            text = normalize_text(text)
+        text = fit_to_budget(text, max_tokens)
+        stage.record_size(estimate_tokens(text), "tokens")
+    return text
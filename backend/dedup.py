@@ -0,0 +1,189 @@
+import os
+import re
+import zlib
+
+import numpy as np
+
+from bank import OPTION_LINE
+
+# --- Near-Duplicate Questions ---
+# Gemini often rewords a question it has already given ("What is deadlock?
+# Explain with an example." / "What is a deadlock? Explain with an example.").
+# Questions are compared as sets of their content words: function words and
+# filler like "briefly" or "with a neat diagram" don't count, so a rewording
+# matches exactly while "time complexity of mergesort" and "... of quicksort"
+# share only 3 of 5 words. Question words (what, why, how) do count: "Why is
+# paging used?" asks something other than "How is paging used?". Short
+# questions are therefore only duplicates when their content words match;
+# long ones may differ by a word. MinHash signatures and LSH banding find
+# candidate pairs without comparing every pair, and a candidate is a duplicate
+# when the exact Jaccard similarity of the two word sets reaches
+# DEDUP_THRESHOLD. Band keys are kept in sorted NumPy arrays, so an index over
+# 100k+ questions stays small and fast to query.
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", 0.85))
+
+FILLER_WORDS = frozenset("""
+a an the of in on at for to from and or with without is are be by its it this that these
+those using use give brief briefly detail details detailed example examples suitable neat diagram diagrams
+short note notes
+""".split())
+
+NUM_BANDS = 32
+BAND_ROWS = 4
+NUM_PERM = NUM_BANDS * BAND_ROWS
+# Signatures are computed this many shingles at a time (a NUM_PERM x chunk array)
+CHUNK_SHINGLES = 1 << 16
+
+# Multiply-shift hash functions (odd a, wrapping uint64 arithmetic, top 32
+# bits); the seed is fixed so signatures are stable across processes
+_rng = np.random.default_rng(20240601)
+_PERM_A = (_rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1))[:, None]
+_PERM_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)[:, None]
+
+
+
+def shingles(text: str) -> np.ndarray:
+    """Sorted unique CRC-32s of the lowercased content words of ``text``, as uint32.
+
+    A text with no content words is compared on all its words.
+    """
+    words = re.findall(r"\w+", text.lower())
+    content = [w for w in words if w not in FILLER_WORDS] or words or [""]
+    return np.unique(np.array([zlib.crc32(w.encode()) for w in content], dtype=np.uint32))
+
+
+def jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    common = np.intersect1d(a, b, assume_unique=True).size
+    return common / (a.size + b.size - common)
+
+
+def band_keys(shingle_sets: list[np.ndarray]) -> np.ndarray:
+    """MinHash each shingle set and hash each band of the signature: (n, NUM_BANDS) uint32."""
+    keys = np.empty((len(shingle_sets), NUM_BANDS), dtype=np.uint32)
+    hashed = np.empty((NUM_PERM, min(CHUNK_SHINGLES, sum(s.size for s in shingle_sets))), dtype=np.uint64)
+    start = 0
+    while start < len(shingle_sets):
+        # A run of sets with about CHUNK_SHINGLES shingles between them
+        end, total = start, 0
+        while end < len(shingle_sets) and (end == start or total + shingle_sets[end].size <= CHUNK_SHINGLES):
+            total += shingle_sets[end].size
+            end += 1
+        chunk = shingle_sets[start:end]
+        values = np.concatenate(chunk).astype(np.uint64)
+        offsets = np.cumsum([0] + [s.size for s in chunk[:-1]])
+        if values.size > hashed.shape[1]:
+            hashed = np.empty((NUM_PERM, values.size), dtype=np.uint64)
+        # In place, and shifted only after the min: the order is decided by the top bits anyway
+        chunk_hashed = hashed[:, :values.size]
+        np.multiply(_PERM_A, values, out=chunk_hashed)
+        chunk_hashed += _PERM_B
+        signatures = (np.minimum.reduceat(chunk_hashed, offsets, axis=1) >> np.uint64(32)).astype(np.uint32)
+        signatures = signatures.T.reshape(-1, NUM_BANDS, BAND_ROWS)
+
+        band = signatures[:, :, 0].copy()
+        for row in range(1, BAND_ROWS):
+            band = band * np.uint32(0x01000193) ^ signatures[:, :, row]
+        keys[start:end] = band
+        start = end
+    return keys
+
+
+class QuestionIndex:
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._shingles: list[np.ndarray] = []
+        self._keys = np.empty((0, NUM_BANDS), dtype=np.uint32)
+        self._size = 0
+        # Rows [0, _indexed) are searchable through per-band sorted copies;
+        # rows added since are scanned directly until the next re-sort
+        self._indexed = 0
+        self._sorted_keys = np.empty((NUM_BANDS, 0), dtype=np.uint32)
+        self._sorted_ids = np.empty((NUM_BANDS, 0), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add_many(self, texts: list[str]):
+        self._append([shingles(t) for t in texts])
+
+    def _append(self, shingle_sets: list[np.ndarray], keys: np.ndarray | None = None):
+        if not shingle_sets:
+            return
+        keys = band_keys(shingle_sets) if keys is None else keys
+        needed = self._size + len(shingle_sets)
+        if needed > len(self._keys):
+            grown = np.empty((max(needed, 2 * len(self._keys), 64), NUM_BANDS), dtype=np.uint32)
+            grown[:self._size] = self._keys[:self._size]
+            self._keys = grown
+        self._keys[self._size:needed] = keys
+        self._shingles.extend(shingle_sets)
+        self._size = needed
+        if self._size - self._indexed > max(256, self._indexed // 8):
+            self._reindex()
+
+    def _reindex(self):
+        keys = self._keys[:self._size].T
+        order = np.argsort(keys, axis=1, kind="stable")
+        self._sorted_keys = np.take_along_axis(keys, order, axis=1)
+        self._sorted_ids = order.astype(np.int32)
+        self._indexed = self._size
+
+    def _candidates(self, keys: np.ndarray) -> list[set[int]]:
+        found = [set() for _ in range(len(keys))]
+        for band in range(NUM_BANDS):
+            column = self._sorted_keys[band]
+            left = np.searchsorted(column, keys[:, band], side="left")
+            right = np.searchsorted(column, keys[:, band], side="right")
+            for q in np.nonzero(right > left)[0]:
+                found[q].update(self._sorted_ids[band, left[q]:right[q]].tolist())
+        if self._indexed < self._size:
+            recent = self._keys[self._indexed:self._size]
+            for q, row in enumerate(keys):
+                hits = np.nonzero((recent == row).any(axis=1))[0]
+                found[q].update((hits + self._indexed).tolist())
+        return found
+
+    def find_many(self, texts: list[str]) -> list[int | None]:
+        """For each text, the position of an indexed near-duplicate, or None."""
+        shingle_sets = [shingles(t) for t in texts]
+        return self._find(shingle_sets, band_keys(shingle_sets)) if shingle_sets else []
+
+    def _find(self, shingle_sets: list[np.ndarray], keys: np.ndarray) -> list[int | None]:
+        matches = []
+        for s, candidates in zip(shingle_sets, self._candidates(keys)):
+            matches.append(next((i for i in sorted(candidates)
+                                 if jaccard(s, self._shingles[i]) >= self.threshold), None))
+        return matches
+
+    def add_unique(self, texts: list[str]) -> list[bool]:
+        """Index the texts that aren't near-duplicates of the index or of each other.
+
+        Returns, per text, whether it was kept.
+        """
+        kept = []
+        shingle_sets = [shingles(t) for t in texts]
+        keys = band_keys(shingle_sets) if shingle_sets else np.empty((0, NUM_BANDS), dtype=np.uint32)
+        for s, k in zip(shingle_sets, keys):
+            is_new = self._find([s], k[None, :])[0] is None
+            if is_new:
+                self._append([s], k[None, :])
+            kept.append(is_new)
+        return kept
+
+
+def drop_near_duplicates(lines: list[str], index: QuestionIndex | None = None) -> list[str]:
+    """Question lines minus near-duplicates of earlier lines or of ``index``.
+
+    A dropped question takes its MCQ choice lines with it; the kept ones are
+    added to ``index``, so one index can follow a whole paper.
+    """
+    index = index if index is not None else QuestionIndex()
+    questions = [line for line in lines if not OPTION_LINE.match(line)]
+    kept = iter(index.add_unique(questions))
+    result, keep = [], True
+    for line in lines:
+        if not OPTION_LINE.match(line):
+            keep = next(kept)
+        if keep:
+            result.append(line)
+    return result
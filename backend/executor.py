@@ -0,0 +1,67 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import metrics
+
+# --- Execution Pools ---
+# CPU-bound work (OCR, rasterization, PDF rendering) goes to a process pool so
+# it never holds the event loop or the GIL. Blocking I/O (upload copies, cache
+# and question-bank reads) goes to a thread pool; Gemini calls are async and
+# take no thread. Both are bounded so a burst of uploads queues instead of
+# starving cheap endpoints like /api/health.
+CPU_WORKERS = int(os.environ.get("CPU_WORKERS", os.cpu_count() or 1))
+IO_WORKERS = int(os.environ.get("IO_WORKERS", 16))
+
+_cpu_pool: ProcessPoolExecutor | None = None
+_io_pool: ThreadPoolExecutor | None = None
+
+
+def get_cpu_pool() -> ProcessPoolExecutor:
+    global _cpu_pool
+    if _cpu_pool is None:
+        # "spawn" keeps the workers clean of the parent's gRPC/threads state
+        _cpu_pool = ProcessPoolExecutor(
+            max_workers=CPU_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _cpu_pool
+
+
+def get_io_pool() -> ThreadPoolExecutor:
+    global _io_pool
+    if _io_pool is None:
+        _io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+    return _io_pool
+
+
+def _call_with_metrics(fn, args, kwargs):
+    # Runs in the worker: ship the stage timings it recorded back with the result
+    result = fn(*args, **kwargs)
+    return result, metrics.registry.drain()
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """Run a picklable, module-level function in the process pool."""
+    loop = asyncio.get_running_loop()
+    result, samples = await loop.run_in_executor(get_cpu_pool(), partial(_call_with_metrics, fn, args, kwargs))
+    metrics.registry.merge(samples)
+    return result
+
+
+async def run_io(fn, *args, **kwargs):
+    """Run a blocking call in the I/O thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_pool(), partial(fn, *args, **kwargs))
+
+
+def shutdown_pools():
+    global _cpu_pool, _io_pool
+    if _cpu_pool is not None:
+        _cpu_pool.shutdown(wait=False, cancel_futures=True)
+        _cpu_pool = None
+    if _io_pool is not None:
+        _io_pool.shutdown(wait=False, cancel_futures=True)
+        _io_pool = None
@@ -0,0 +1,293 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz  # PyMuPDF for native text extraction
+import numpy as np
+from PIL import Image, ImageEnhance, ImageOps
+
+from metrics import timed
+from ocr import OCR_BACKEND, OCR_LANG, get_backend
+
+# --- Text Extraction Functions ---
+# Kept in their own module so the process pool can import them without
+# pulling in the FastAPI app.
+
+# Render resolution for OCR is picked per page so text lines come out about
+# OCR_TARGET_LINE_PX tall (Tesseract's LSTM models rescale each line to about
+# that height anyway, so more pixels only cost time), within [OCR_MIN_DPI,
+# OCR_MAX_DPI] and never above the resolution the page was scanned at.
+# OCR_DPI is used when the line height can't be estimated. Setting the min and
+# max DPI equal turns this off.
+OCR_DPI = 300
+OCR_MIN_DPI = int(os.environ.get("OCR_MIN_DPI", 150))
+OCR_MAX_DPI = int(os.environ.get("OCR_MAX_DPI", 400))
+OCR_TARGET_LINE_PX = int(os.environ.get("OCR_TARGET_LINE_PX", 36))
+OCR_PREVIEW_DPI = 72
+# Uploaded images are downsampled to the same target line height, and never
+# OCR'd with a longest side above this many pixels
+OCR_IMAGE_MAX_SIDE = int(os.environ.get("OCR_IMAGE_MAX_SIDE", 4000))
+OCR_PREVIEW_SIDE = 1000
+# Preprocessing profile: one of OCR_PROFILES, or "auto" to pick per image
+OCR_PROFILE = os.environ.get("OCR_PROFILE", "auto")
+# "auto" binarizes images whose ink and paper are closer than this in gray level
+OCR_LOW_CONTRAST = int(os.environ.get("OCR_LOW_CONTRAST", 80))
+# Pages OCR'd concurrently by extract_text_from_pdf, and the per-page
+# Tesseract limit. The server doesn't use these page threads: it hands each
+# page to the process pool as its own task (see extract_pdf in main.py), so
+# CPU_WORKERS bounds OCR across all concurrent uploads.
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", os.cpu_count() or 1))
+OCR_PAGE_TIMEOUT = float(os.environ.get("OCR_PAGE_TIMEOUT", 60))
+
+# Parallelism comes from running one page per Tesseract call, so keep each
+# call single-threaded instead of oversubscribing the cores with OpenMP.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+# A page is OCR'd when it has no text layer, or when a thin text layer sits
+# on a page that is mostly image (a scan with a stamped header or page number).
+OCR_MIN_TEXT_CHARS = int(os.environ.get("OCR_MIN_TEXT_CHARS", 200))
+OCR_MIN_IMAGE_COVERAGE = float(os.environ.get("OCR_MIN_IMAGE_COVERAGE", 0.5))
+
+
+def extraction_settings(suffix: str) -> dict:
+    """Knobs that change extraction output; part of the extraction cache key."""
+    return {
+        "suffix": suffix,
+        "dpi": OCR_DPI,
+        "min_dpi": OCR_MIN_DPI,
+        "max_dpi": OCR_MAX_DPI,
+        "target_line_px": OCR_TARGET_LINE_PX,
+        "image_max_side": OCR_IMAGE_MAX_SIDE,
+        "profile": OCR_PROFILE,
+        "low_contrast": OCR_LOW_CONTRAST,
+        "ocr_backend": OCR_BACKEND,
+        "lang": OCR_LANG,
+        "min_text_chars": OCR_MIN_TEXT_CHARS,
+        "min_image_coverage": OCR_MIN_IMAGE_COVERAGE,
+    }
+
+
+def image_coverage(page: fitz.Page) -> float:
+    """Fraction of the page area covered by embedded images."""
+    page_area = abs(page.rect)
+    if not page_area:
+        return 0.0
+    covered = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    return min(1.0, covered / page_area)
+
+
+def needs_ocr(page: fitz.Page, native_text: str) -> bool:
+    if not native_text:
+        return True
+    return len(native_text) < OCR_MIN_TEXT_CHARS and image_coverage(page) >= OCR_MIN_IMAGE_COVERAGE
+
+
+# --- OCR Preprocessing ---
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Gray level that best separates ink from paper."""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    weight_dark = np.cumsum(hist)
+    weight_light = weight_dark[-1] - weight_dark
+    level_sum = np.cumsum(hist * np.arange(256))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_dark = level_sum / weight_dark
+        mean_light = (level_sum[-1] - level_sum) / weight_light
+        between = weight_dark * weight_light * (mean_dark - mean_light) ** 2
+    return int(np.argmax(np.nan_to_num(between)))
+
+
+def ink_contrast(gray: np.ndarray) -> float:
+    """Gray-level gap between the mean ink and the mean paper pixel."""
+    threshold = otsu_threshold(gray)
+    dark, light = gray[gray <= threshold], gray[gray > threshold]
+    if not dark.size or not light.size:
+        return 0.0
+    return float(light.mean() - dark.mean())
+
+
+def estimate_line_height(gray: Image.Image) -> float | None:
+    """Median height in pixels of the text lines in a page image, if it has any.
+
+    Rows with ink form runs, one per text line, in a horizontal projection.
+    """
+    pixels = np.asarray(gray)
+    ink_rows = (pixels <= otsu_threshold(pixels)).mean(axis=1) > 0.005
+    edges = np.diff(np.concatenate(([0], ink_rows.astype(np.int8), [0])))
+    heights = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    heights = heights[heights >= 2]
+    if len(heights) < 3:
+        return None
+    return float(np.median(heights))
+
+
+def preprocess_gray(img: Image.Image) -> Image.Image:
+    return img.convert('L')
+
+
+def preprocess_contrast(img: Image.Image) -> Image.Image:
+    return ImageEnhance.Contrast(img.convert('L')).enhance(2.0)
+
+
+def preprocess_binarize(img: Image.Image) -> Image.Image:
+    # Stretch faint scans first, then a hard Otsu threshold
+    img = ImageOps.autocontrast(img.convert('L'), cutoff=1)
+    threshold = otsu_threshold(np.asarray(img.reduce(4) if min(img.size) >= 400 else img))
+    return img.point([0] * (threshold + 1) + [255] * (255 - threshold))
+
+
+OCR_PROFILES = {
+    "gray": preprocess_gray,
+    "contrast": preprocess_contrast,
+    "binarize": preprocess_binarize,
+}
+
+
+def choose_profile(img: Image.Image) -> str:
+    if OCR_PROFILE != "auto":
+        return OCR_PROFILE
+    sample = img.convert('L')
+    if min(sample.size) >= 400:
+        sample = sample.reduce(4)
+    # Faint or uneven scans (grey paper, pencil, shadows) read better thresholded
+    return "binarize" if ink_contrast(np.asarray(sample)) < OCR_LOW_CONTRAST else "contrast"
+
+
+def ocr_page(img: Image.Image, profile: str | None = None) -> str:
+    with timed("extraction", "preprocess"):
+        img = OCR_PROFILES[profile or choose_profile(img)](img)
+    try:
+        with timed("extraction", "ocr_page", img.width * img.height, "pixels"):
+            return get_backend().recognize(img, timeout=OCR_PAGE_TIMEOUT)
+    except RuntimeError as e:  # both backends signal a timeout this way
+        print(f"[page OCR] error: {e}")
+        return ""
+
+
+def scanned_dpi(page: fitz.Page) -> float | None:
+    """Resolution of the sharpest image on the page, in pixels per inch of page."""
+    resolutions = [
+        info["width"] * 72 / fitz.Rect(info["bbox"]).width
+        for info in page.get_image_info() if fitz.Rect(info["bbox"]).width > 0
+    ]
+    return max(resolutions, default=None)
+
+
+def choose_dpi(page: fitz.Page) -> int:
+    if OCR_MIN_DPI >= OCR_MAX_DPI:
+        return OCR_MAX_DPI
+    with timed("extraction", "choose_dpi") as stage:
+        pix = page.get_pixmap(dpi=OCR_PREVIEW_DPI, colorspace=fitz.csGRAY)
+        line_px = estimate_line_height(Image.frombytes("L", (pix.width, pix.height), pix.samples))
+        dpi = OCR_DPI if line_px is None else OCR_TARGET_LINE_PX * OCR_PREVIEW_DPI / line_px
+        native = scanned_dpi(page)
+        if native:
+            dpi = min(dpi, native)
+        dpi = int(min(OCR_MAX_DPI, max(OCR_MIN_DPI, dpi)))
+        stage.record_size(dpi, "dpi")
+    return dpi
+
+
+def render_page(page: fitz.Page, dpi: int | None = None) -> Image.Image:
+    dpi = dpi or choose_dpi(page)
+    # Render straight to grayscale: a third of the memory of an RGB bitmap
+    with timed("extraction", "rasterize") as stage:
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        stage.record_size(len(pix.samples), "bytes")
+        return Image.frombytes("L", (pix.width, pix.height), pix.samples)
+
+
+def ocr_pdf_pages(path: str, workers: int | None = None, page_numbers: list[int] | None = None) -> list[str]:
+    """OCR pages of a PDF concurrently, returning text in page order.
+
+    Only the zero-based ``page_numbers`` are OCR'd when given, else every page.
+
+    Pages are rasterized one at a time and at most two per worker are alive
+    at once, so peak memory does not grow with document length. Tesseract
+    runs as a subprocess (pytesseract) or without the GIL (tesserocr), so a
+    thread pool is enough to keep all cores busy.
+    """
+    workers = max(1, workers or OCR_WORKERS)
+    texts = []
+    with fitz.open(path) as doc:
+        pages = doc if page_numbers is None else (doc[n] for n in page_numbers)
+        if workers == 1:
+            return [ocr_page(render_page(page)) for page in pages]
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr") as pool:
+            for page in pages:
+                pending.append(pool.submit(ocr_page, render_page(page)))
+                if len(pending) >= 2 * workers:
+                    texts.append(pending.popleft().result())
+            texts.extend(f.result() for f in pending)
+    return texts
+
+
+def native_pdf_pages(path: str) -> tuple[list[str], list[int]]:
+    """Native text per page, and the zero-based numbers of the pages that need OCR."""
+    page_texts = []
+    ocr_page_numbers = []
+    try:
+        with timed("extraction", "native_text") as stage, fitz.open(path) as doc:
+            for page in doc:
+                chunk = page.get_text().strip()
+                if needs_ocr(page, chunk):
+                    ocr_page_numbers.append(page.number)
+                page_texts.append(chunk)
+            stage.record_size(len(page_texts), "pages")
+    except Exception as e:
+        print(f"[native PDF extract] error: {e}")
+    return page_texts, ocr_page_numbers
+
+
+def extract_text_from_pdf(path: str) -> str:
+    # Native text per page, then OCR only the pages that need it
+    page_texts, ocr_page_numbers = native_pdf_pages(path)
+    if ocr_page_numbers:
+        print(f"→ OCR on {len(ocr_page_numbers)} of {len(page_texts)} PDF pages")
+        try:
+            with timed("extraction", "pdf_ocr", len(ocr_page_numbers), "pages"):
+                ocr_texts = ocr_pdf_pages(path, page_numbers=ocr_page_numbers)
+            for number, ocr_text in zip(ocr_page_numbers, ocr_texts):
+                if ocr_text:
+                    page_texts[number] = ocr_text
+        except Exception as e:
+            print(f"[PDF OCR] error: {e}")
+    return "\n".join(t for t in page_texts if t).strip()
+
+
+def load_image(path: str) -> Image.Image:
+    """Open an uploaded image for OCR, downsampled if its text is larger than needed."""
+    with timed("extraction", "load_image") as stage:
+        # Line height is measured on a small preview; for JPEGs thumbnail()
+        # decodes straight at reduced scale, so this is cheap even for big photos
+        preview = Image.open(path)
+        width, height = preview.size
+        preview.thumbnail((OCR_PREVIEW_SIDE, OCR_PREVIEW_SIDE))
+        line_px = estimate_line_height(preview.convert('L'))
+
+        # Scale so text lines come out OCR_TARGET_LINE_PX tall: never up, and
+        # never below the long side of an A4 page at OCR_MIN_DPI
+        scale = 1.0
+        if line_px is not None:
+            floor = min(1.0, OCR_MIN_DPI * 11.7 / max(width, height))
+            scale = max(floor, min(scale, OCR_TARGET_LINE_PX / (line_px * width / preview.width)))
+        scale = min(scale, OCR_IMAGE_MAX_SIDE / max(width, height))
+        img = Image.open(path)
+        if scale < 1:
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            img.draft('L', size)  # JPEG: decode at the nearest 1/2, 1/4 or 1/8 scale
+            img = img.convert('L').resize(size, Image.BILINEAR, reducing_gap=2.0)
+        stage.record_size(img.width * img.height, "pixels")
+        return img
+
+
+def extract_text_from_image(path: str) -> str:
+    try:
+        img = load_image(path)
+        img = OCR_PROFILES[choose_profile(img)](img)
+        with timed("extraction", "image_ocr", img.width * img.height, "pixels"):
+            text = get_backend().recognize(img)
+        return text
+    except Exception as e:
+        print(f"[image OCR] error: {e}")
+        return ""
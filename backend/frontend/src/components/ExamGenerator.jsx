@@ -44,6 +44,8 @@ export default function ExamGenerator({ user }) {
   let nonMcqCounter = 1;
   //const API_URL = "http://localhost:8001";
   const API_URL = "https://www.qnagenai.com";
+  // Scopes the uploaded syllabus to this user on the backend
+  const sessionHeaders = user ? { 'X-Session-Id': user.uid } : {};
 
   // Reset prompt if user logs in
   useEffect(() => {
@@ -144,6 +146,7 @@ export default function ExamGenerator({ user }) {
     fd.append('file', syllabusFile);
     const res = await fetch(`${API_URL}/api/upload-syllabus`, {
       method: 'POST',
+      headers: sessionHeaders,
       body: fd,
     });
     if (!res.ok) {
@@ -255,28 +258,36 @@ export default function ExamGenerator({ user }) {
         const aggregated = [];
         const validChapters = chapterRequests.filter(x => x.selected && x.chapter.trim() && x.numQuestions > 0);
         if (!validChapters.length) throw new Error('Please provide at least one valid chapter.');
-        for (const c of validChapters) {
-          const payload = {
+        const payload = {
+          chapters: validChapters.map(c => ({
             chapter: c.chapter,
             numQuestions: c.numQuestions,
             mcq: questionTypes.mcq,
             shortAnswer: questionTypes.shortAnswer,
             longAnswer: questionTypes.longAnswer
-          };
-          console.log('Multi Mode Payload for Chapter:', payload);
-          const res = await fetch(`${API_URL}/api/nlp-generate-questions-by-chapter`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(payload)
-          });
-          if (!res.ok) {
-            const errorText = await res.text();
-            console.error('API Error:', errorText);
-            throw new Error(`Generation failed for ${c.chapter}: ${errorText}`);
-          }
-          const { questions } = await res.json();
-          questions.forEach(q => aggregated.push({ question: q, marks: c.marks }));
+          }))
+        };
+        console.log('Multi Mode Payload:', payload);
+        const res = await fetch(`${API_URL}/api/nlp-generate-questions-by-chapters`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json', ...sessionHeaders },
+          body: JSON.stringify(payload)
+        });
+        if (!res.ok) {
+          const errorText = await res.text();
+          console.error('API Error:', errorText);
+          throw new Error('Generation failed: ' + errorText);
         }
+        const { results } = await res.json();
+        const failed = [];
+        results.forEach((r, i) => {
+          if (r.error) {
+            failed.push(`${r.chapter}: ${r.error}`);
+            return;
+          }
+          r.questions.forEach(q => aggregated.push({ question: q, marks: validChapters[i].marks }));
+        });
+        if (failed.length) setError('Generation failed for ' + failed.join('; '));
         setQuestions(aggregated);
         return;
       }
@@ -428,7 +439,7 @@ export default function ExamGenerator({ user }) {
       // Call export-mocktestpaper endpoint
       const res = await fetch(`${API_URL}/api/export-mocktestpaper`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', ...sessionHeaders },
         body: JSON.stringify(payload),
       });
 
@@ -495,7 +506,7 @@ export default function ExamGenerator({ user }) {
             console.log(`Sending API call for question: "${c.question}"`);
             const res = await fetch(`${API_URL}/api/nlp-generate-answer-to-question`, {
               method: 'POST',
-              headers: { 'Content-Type': 'application/json' },
+              headers: { 'Content-Type': 'application/json', ...sessionHeaders },
               body: JSON.stringify({ question: c.question })
             });
 
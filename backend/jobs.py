@@ -0,0 +1,120 @@
+import asyncio
+import os
+import time
+import uuid
+
+# --- Background Jobs ---
+# Long extractions (scanned papers with many pages) run as jobs so they are
+# not bound by the router's request timeout: submit returns a job id at once,
+# a fixed number of worker tasks drain the queue, and clients poll or
+# subscribe for progress. Finished jobs are kept for JOB_TTL seconds.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_MAX_PENDING = int(os.environ.get("JOB_MAX_PENDING", 100))
+JOB_TTL = float(os.environ.get("JOB_TTL", 3600))
+
+TERMINAL_STATUSES = ("done", "failed")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str, run):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.stage = None
+        self.pages_done = 0
+        self.pages_total = None
+        self.result = None
+        self.error = None
+        self.expires = None
+        self._run = run
+        self._changed = asyncio.Event()
+
+    def update(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+        # Wake current subscribers; later ones wait on a fresh event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def progress(self, pages_done: int, pages_total: int):
+        self.update(pages_done=pages_done, pages_total=pages_total)
+
+    def watch(self) -> asyncio.Event:
+        """Event set by the next update; take it before reading the state."""
+        return self._changed
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "pages_done": self.pages_done,
+            "pages_total": self.pages_total,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    def __init__(self, workers: int, max_pending: int, ttl: float):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._jobs: dict[str, Job] = {}
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    def submit(self, kind: str, run) -> Job:
+        """Queue ``await run(job)``; its return value becomes ``job.result``."""
+        self._purge()
+        if self._queue is None:
+            # Started on first use so the workers belong to the serving loop
+            self._queue = asyncio.Queue()
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self._queue.qsize() >= self.max_pending:
+            raise QueueFull()
+        job = Job(kind, run)
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        self._purge()
+        return self._jobs.get(job_id)
+
+    async def _worker(self):
+        queue = self._queue
+        while True:
+            job = await queue.get()
+            job.update(status="running")
+            try:
+                result = await job._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.update(status="failed", error=getattr(e, "detail", None) or str(e),
+                           expires=time.monotonic() + self.ttl)
+            else:
+                job.update(status="done", result=result, expires=time.monotonic() + self.ttl)
+            finally:
+                job._run = None
+                queue.task_done()
+
+    def _purge(self):
+        now = time.monotonic()
+        for job_id in [j.id for j in self._jobs.values() if j.expires is not None and j.expires <= now]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._queue = None
+
+
+job_queue = JobQueue(JOB_WORKERS, JOB_MAX_PENDING, JOB_TTL)
@@ -0,0 +1,282 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+# --- Gemini Client ---
+# Every Gemini call goes through one client: models are created once per
+# model name and reused, requests and tokens per minute are metered by token
+# buckets, transient upstream errors (5xx, timeouts, 429) are retried with
+# jittered exponential backoff, and a circuit breaker fails calls fast while
+# the upstream keeps failing. Calls waiting for a slot or for rate capacity
+# count as queued; past LLM_MAX_QUEUE new calls are refused.
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
+LLM_REQUESTS_PER_MINUTE = float(os.environ.get("LLM_REQUESTS_PER_MINUTE", 1000))
+LLM_TOKENS_PER_MINUTE = float(os.environ.get("LLM_TOKENS_PER_MINUTE", 2_000_000))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 32))
+LLM_MAX_QUEUE = int(os.environ.get("LLM_MAX_QUEUE", 500))
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 60))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 3))
+LLM_RETRY_BASE_DELAY = float(os.environ.get("LLM_RETRY_BASE_DELAY", 1))
+LLM_RETRY_MAX_DELAY = float(os.environ.get("LLM_RETRY_MAX_DELAY", 20))
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_RESET = float(os.environ.get("LLM_BREAKER_RESET", 30))
+
+# HTTP statuses (google.api_core exceptions carry them as .code) worth retrying
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def get_genai():
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=os.environ.get("GOOGLE_API_KEY"))
+                _genai = genai
+    return _genai
+
+
+def estimate_tokens(contents) -> int:
+    """Rough token count of a prompt (string or list of parts): ~4 characters a token."""
+    if isinstance(contents, str):
+        return len(contents) // 4 + 1
+    if isinstance(contents, dict):
+        return sum(estimate_tokens(v) for v in contents.values() if isinstance(v, (str, list, dict)))
+    if isinstance(contents, list):
+        return sum(estimate_tokens(part) for part in contents)
+    return 0
+
+
+class LLMUnavailable(Exception):
+    """Refused without calling Gemini: circuit open or too many calls queued."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+def is_transient(e: Exception) -> bool:
+    return isinstance(e, (TimeoutError, asyncio.TimeoutError, ConnectionError)) \
+        or getattr(e, "code", None) in RETRY_STATUSES
+
+
+class TokenBucket:
+    """``per_minute`` units a minute, with up to a minute's worth available at once."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self._tokens = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` (possibly into debt); returns how long to wait before using it."""
+        self._refill()
+        self._tokens -= min(amount, self.capacity)
+        if self._tokens >= 0:
+            return 0.0
+        wait = -self._tokens / self.rate
+        self.throttled += 1
+        self.throttled_seconds += wait
+        return wait
+
+    def refund(self, amount: float):
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int, reset_after: float):
+        self.failures = failures
+        self.reset_after = reset_after
+        self.state = "closed"  # closed | open | half_open
+        self.trips = 0
+        self._consecutive = 0
+        self._opened_at = 0.0
+
+    def check(self):
+        """Raise LLMUnavailable unless a call may go out now."""
+        if self.state == "closed":
+            return
+        # Open: refuse until reset_after has passed, then let one trial call
+        # through (half-open); another goes if the trial hasn't settled in time
+        remaining = self._opened_at + self.reset_after - time.monotonic()
+        if remaining > 0:
+            raise LLMUnavailable(f"Gemini circuit {self.state.replace('_', '-')}", remaining)
+        self.state = "half_open"
+        self._opened_at = time.monotonic()
+
+    def success(self):
+        self.state = "closed"
+        self._consecutive = 0
+
+    def failure(self):
+        self._consecutive += 1
+        if self.state == "half_open" or self._consecutive >= self.failures:
+            if self.state != "open":
+                self.trips += 1
+                print(f"[Gemini client] circuit open for {self.reset_after:g}s after {self._consecutive} failures")
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+
+class GeminiClient:
+    def __init__(self):
+        self.requests = TokenBucket(LLM_REQUESTS_PER_MINUTE)
+        self.tokens = TokenBucket(LLM_TOKENS_PER_MINUTE)
+        self.breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET)
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.queued = 0
+        self.in_flight = 0
+        self._models = {}
+        self._slots = None
+        self._loop = None
+
+    def model(self, name: str = GEMINI_MODEL):
+        if name not in self._models:
+            self._models[name] = get_genai().GenerativeModel(name)
+        return self._models[name]
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # One per event loop; the app has one, but tests and benchmarks may start several
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+            self._loop = loop
+        return self._slots
+
+    def _release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+    async def _call(self, send, tokens: int, hold: bool = False):
+        """``await send()`` under the limits, with retries; the breaker sees each attempt.
+
+        With ``hold`` the concurrency slot is still taken when this returns, and
+        the caller gives it back with ``_release()``.
+        """
+        if self.queued >= LLM_MAX_QUEUE:
+            self.rejected += 1
+            raise LLMUnavailable("Too many Gemini calls queued", 1)
+        self.calls += 1
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                self.breaker.check()
+            except LLMUnavailable:
+                self.rejected += 1
+                raise
+            self.queued += 1
+            waiting = True
+            try:
+                # Wait out the rate limits before taking a slot, so a throttled
+                # call doesn't keep one from a call that could go now
+                wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+                if wait:
+                    await asyncio.sleep(wait)
+                await self._semaphore().acquire()
+                self.queued -= 1
+                waiting = False
+                self.in_flight += 1
+                held = False
+                try:
+                    result = await send()
+                    held = hold
+                finally:
+                    if not held:
+                        self._release()
+            except Exception as e:
+                transient = is_transient(e)
+                if transient and getattr(e, "code", None) != 429:
+                    self.breaker.failure()  # quota errors say nothing about upstream health
+                elif self.breaker.state == "half_open":
+                    self.breaker.success()
+                if not transient or attempt == LLM_MAX_RETRIES or self.breaker.state == "open":
+                    self.errors += 1
+                    raise
+                self.retries += 1
+                delay = random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** attempt))
+                print(f"[Gemini client] {type(e).__name__}: {e}; retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.success()
+                return result
+            finally:
+                if waiting:
+                    self.queued -= 1
+
+    async def generate(self, contents, temperature: float | None = None, max_output_tokens: int | None = None,
+                       model: str = GEMINI_MODEL) -> str:
+        """Text of one Gemini response (stripped)."""
+        genai = get_genai()
+        config = genai.types.GenerationConfig(temperature=temperature, max_output_tokens=max_output_tokens)
+        estimate = estimate_tokens(contents) + (max_output_tokens or 0)
+
+        # The async API keeps calls off the shared I/O thread pool, which uploads
+        # and bank lookups use, and makes in_flight the number really running
+        async def send():
+            response = await self.model(model).generate_content_async(contents, generation_config=config,
+                                                                      request_options={"timeout": LLM_TIMEOUT})
+            self._settle(response, estimate)
+            return response.text.strip()
+
+        return await self._call(send, estimate)
+
+    async def stream(self, contents, temperature: float | None = None, max_output_tokens: int | None = None,
+                     model: str = GEMINI_MODEL):
+        """Yield the response text as it arrives. Only starting the stream is retried."""
+        genai = get_genai()
+        config = genai.types.GenerationConfig(temperature=temperature, max_output_tokens=max_output_tokens)
+        estimate = estimate_tokens(contents) + (max_output_tokens or 0)
+
+        async def send():
+            return await self.model(model).generate_content_async(contents, generation_config=config, stream=True,
+                                                                  request_options={"timeout": LLM_TIMEOUT})
+
+        # The slot is held while the response streams in, until it ends or
+        # the caller closes the stream
+        response = await self._call(send, estimate, hold=True)
+        try:
+            async for chunk in response:
+                yield chunk.text if chunk.parts else ""
+        finally:
+            self._release()
+
+    def _settle(self, response, estimate: int):
+        """Give back the part of the token estimate the call didn't use."""
+        usage = getattr(response, "usage_metadata", None)
+        used = getattr(usage, "total_token_count", 0) if usage is not None else 0
+        if used:
+            self.tokens.refund(estimate - used)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "throttled_requests": self.requests.throttled,
+            "throttled_tokens": self.tokens.throttled,
+            "throttled_seconds": round(self.requests.throttled_seconds + self.tokens.throttled_seconds, 3),
+            "circuit_state": self.breaker.state,
+            "circuit_trips": self.breaker.trips,
+        }
+
+
+llm = GeminiClient()
@@ -1,46 +1,99 @@
-from fastapi import FastAPI, File, UploadFile, Request, HTTPException
+from fastapi import FastAPI, File, UploadFile, Request, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, HTMLResponse, StreamingResponse
-from pdfminer.high_level import extract_text
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
-import fitz  # PyMuPDF for native text extraction
-from pdf2image import convert_from_path
-import pdfplumber
-from PIL import Image, ImageEnhance
-import pytesseract
 import os
 import re
 from fastapi import Depends
 from pydantic import BaseModel
-from typing import Optional
-import razorpay
+from typing import TYPE_CHECKING, Optional
 from fastapi.staticfiles import StaticFiles
 import json
 import io
-import pdfkit
-import google.generativeai as genai
+import asyncio
 import tempfile
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, ListFlowable, ListItem
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.enums import TA_LEFT
+import time
+from pathlib import Path
 from itertools import groupby
 from operator import itemgetter
+from executor import CPU_WORKERS, run_cpu, run_io, shutdown_pools
+from cache import extraction_cache, generation_cache
+from syllabus import SyllabusIndex, SyllabusStore, SYLLABUS_STORE_SIZE, DEFAULT_SESSION
+from jobs import Job, QueueFull, TERMINAL_STATUSES, job_queue
+from bank import OPTION_LINE, question_bank, question_blocks, question_lines, source_hash
+if TYPE_CHECKING:
+    import dedup  # imported where used, so NumPy loads on first use
+from llm import GEMINI_MODEL, LLMUnavailable, llm
+from compaction import (PROMPT_BUDGET_ANSWER, PROMPT_BUDGET_CHAPTER, PROMPT_BUDGET_MOCK, PROMPT_BUDGET_TEXT,
+                        compact, normalize_text)
+import metrics
+from metrics import timed
+import hashlib
+
+# Heavy dependencies load on first use of the subsystem that needs them, so
+# the app starts serving /api/health without importing them:
+# - google.generativeai: llm.get_genai(), on the first Gemini call
+# - razorpay: get_razorpay_client(), on the first order
+# - extraction (PyMuPDF, Pillow, pytesseract): on the first upload
+# - paper (ReportLab): on the first PDF export
 
 
 app = FastAPI()
 
+@app.on_event("shutdown")
+def shutdown_executors():
+    job_queue.shutdown()
+    shutdown_pools()
+    question_bank.close()
+
 @app.get("/api/health")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/api/cache-stats")
+def cache_stats():
+    return {"extraction": extraction_cache.stats(), "generation": generation_cache.stats(),
+            "question_bank": question_bank.stats()}
+
+@app.get("/api/metrics")
+def metrics_endpoint():
+    """ Per-stage latency/size histograms and cache counters, Prometheus text format """
+    caches = {"extraction": extraction_cache.stats(), "generation": generation_cache.stats(),
+              "question_bank": question_bank.stats()}
+    return PlainTextResponse(
+        metrics.registry.render() + metrics.render_cache_stats(caches) + metrics.render_llm_stats(llm.stats()),
+        media_type="text/plain; version=0.0.4"
+    )
+
 # Razorpay Configuration
 RAZORPAY_KEY_ID = os.environ.get('RAZORPAY_KEY_ID')
 RAZORPAY_KEY_SECRET = os.environ.get('RAZORPAY_KEY_SECRET')
-razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
+_razorpay_client = None
+
+def get_razorpay_client():
+    global _razorpay_client
+    if _razorpay_client is None:
+        import razorpay
+        _razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
+    return _razorpay_client
+
+# Gemini API Configuration (model, limits and retries: llm.py)
+def gemini_error(e: Exception) -> HTTPException:
+    """ 503 with Retry-After when the Gemini client refused the call, else 502 """
+    if isinstance(e, LLMUnavailable):
+        return HTTPException(status_code=503, detail=f"Gemini is unavailable: {e}. Try again shortly.",
+                             headers={"Retry-After": str(max(1, round(e.retry_after)))})
+    return HTTPException(status_code=502, detail=f"Gemini API error: {e}")
+
+async def generate_cached(prompt: str, temperature: float, max_output_tokens: int, pipeline: str = "generation") -> str:
+    """ Gemini text generation through the shared response cache """
+    config = {"temperature": temperature, "max_output_tokens": max_output_tokens}
+
+    async def call():
+        with timed(pipeline, "gemini", len(prompt), "chars"):
+            return await llm.generate(prompt, **config)
 
-# Gemini API Configuration
-genai.configure(api_key=os.environ.get("GOOGLE_API_KEY"))
+    return await generation_cache.get_or_generate(generation_cache.key(GEMINI_MODEL, prompt, config), call)
 
 # CORS Middleware
 origins = [
@@ -48,6 +101,60 @@ origins = [
     "https://qpg-4e99a2de660c.herokuapp.com",
     "http://localhost:5173",
 ]
+
+SYLLABUS_TXT = "syllabus.txt"
+
+# --- Upload Handling ---
+# Uploads are copied to their own temp file in fixed-size chunks and hashed on
+# the way, so memory per upload stays constant whatever the file size. The
+# extractors then open that file by path.
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", 50 * 1024 * 1024))
+UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_BYTES", 1024 * 1024))
+UPLOAD_PATHS = ("/api/upload-question-paper", "/api/upload-question-paper/jobs", "/api/upload-syllabus")
+# Allowance for the multipart boundaries and headers around the file itself
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+class UploadTooLarge(Exception):
+    pass
+
+def upload_too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File too large. Maximum size is {UPLOAD_MAX_BYTES / (1024 * 1024):.3g} MB.")
+
+class UploadSizeLimit:
+    """ Rejects oversized uploads before the multipart body is spooled to disk """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in UPLOAD_PATHS:
+            return await self.app(scope, receive, send)
+        limit = UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD
+        # On the declared length, before the body is read at all
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            response = JSONResponse(status_code=413, content={"detail": upload_too_large().detail})
+            return await response(scope, receive, send)
+
+        # Chunked bodies declare no length: count the bytes as they arrive.
+        # FastAPI passes an HTTPException raised while parsing the form through
+        # as the response
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise upload_too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(UploadSizeLimit)
+
+# Added last, so it is the outermost layer and the upload 413s get CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -55,8 +162,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-TEMP_PDF = "temp_syllabus.pdf"
-SYLLABUS_TXT = "syllabus.txt"
+def copy_upload(src, suffix: str) -> tuple[str, str, int]:
+    """ Copy an upload to a new temp file; returns (path, sha256 hex, size) """
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        try:
+            while chunk := src.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > UPLOAD_MAX_BYTES:
+                    raise UploadTooLarge()
+                digest.update(chunk)
+                tmp.write(chunk)
+        except BaseException:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+    return tmp.name, digest.hexdigest(), size
+
+async def save_upload(file: UploadFile, suffix: str, pipeline: str) -> tuple[str, str, int]:
+    if file.size is not None and file.size > UPLOAD_MAX_BYTES:
+        raise upload_too_large()
+    try:
+        with timed(pipeline, "save") as stage:
+            path, file_hash, size = await run_io(copy_upload, file.file, suffix)
+            stage.record_size(size, "bytes")
+    except UploadTooLarge:
+        raise upload_too_large()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"File save error: {e}")
+    return path, file_hash, size
+
+# Parsed syllabi per user/session (X-Session-Id header); the default session
+# also persists to SYLLABUS_TXT for clients that don't send one
+syllabus_store = SyllabusStore(SYLLABUS_STORE_SIZE, legacy_path=SYLLABUS_TXT)
+
+def session_syllabus(session_id: str) -> SyllabusIndex:
+    syllabus = syllabus_store.get(session_id)
+    if syllabus is None:
+        raise HTTPException(status_code=400, detail="No syllabus uploaded.")
+    return syllabus
 
 # Fake in-memory user data store
 fake_users_db = {}
@@ -85,7 +230,7 @@ class OrderRequest(BaseModel):
 @app.post("/api/create-order")
 async def create_order(order: OrderRequest):
     try:
-        payment_order = razorpay_client.order.create(dict(
+        payment_order = get_razorpay_client().order.create(dict(
             amount=int(order.amount * 100),
             currency='INR',
             payment_capture='1'
@@ -134,6 +279,7 @@ class TextIn(BaseModel):
     mcq: bool
     shortAnswer: bool
     longAnswer: bool
+    fromBank: bool = False
 
 class ChapterIn(BaseModel):
     chapter: str
@@ -141,6 +287,7 @@ class ChapterIn(BaseModel):
     mcq: bool
     shortAnswer: bool
     longAnswer: bool
+    fromBank: bool = False
 
 class QuestionIn(BaseModel):
     question: str
@@ -148,20 +295,98 @@ class QuestionIn(BaseModel):
 class AnswerRequest(BaseModel):
     question: str
 
+# --- Question Bank ---
+# Generated and extracted questions are stored in the bank (bank.py). With
+# "fromBank" set, a generation request is first filled with stored questions
+# made from the same source text, and Gemini is asked only for the shortfall.
+# The bank holds one entry per question, MCQ choices included (question_blocks),
+# so requests are counted and filled by question, not by response line.
+def question_type(payload: TextIn | ChapterIn) -> str:
+    """ The requested question types, e.g. "MCQ, short answer"; empty when none is selected """
+    types = []
+    if payload.mcq: types.append("MCQ")
+    if payload.shortAnswer: types.append("short answer")
+    if payload.longAnswer: types.append("long answer")
+    return ", ".join(types)
+
+async def bank_take(text_hash: str, count: int, **fields) -> list[str]:
+    """ Up to ``count`` stored questions, each with its MCQ choice lines """
+    try:
+        return await run_io(question_bank.take, text_hash, count, **fields)
+    except Exception as e:
+        print(f"[Question bank] lookup failed: {e}")
+        return []
+
+async def bank_store(questions: list[str], source: str, text_hash: str, **fields):
+    """ A bank failure is logged, never passed on to the request """
+    try:
+        await run_io(question_bank.add, questions, source, text_hash, **fields)
+    except Exception as e:
+        print(f"[Question bank] store failed: {e}")
+
+# Generated questions that are near-duplicates of the banked ones or of each
+# other are dropped and the shortfall asked for again, listing the questions
+# seen so far, as mock-test sections are
+QUESTION_RETRIES = int(os.environ.get("QUESTION_RETRIES", 2))
+
+def avoid_prompt(exclude: list[str]) -> str:
+    if not exclude:
+        return ""
+    return "Do not repeat or reword any of these questions:\n" + "\n".join(f"- {q}" for q in exclude)
+
+async def fill_questions(count: int, generate, banked: list[str], pipeline: str,
+                         index: "dedup.QuestionIndex | None" = None) -> list[str]:
+    """ At least ``count`` new questions as response lines, unless Gemini keeps coming back short
+
+    ``generate(count, exclude)`` returns response lines; whatever is a
+    near-duplicate of ``banked``, ``index`` or an earlier line is dropped
+    (kept questions are added to ``index``) and asked for again, at most
+    QUESTION_RETRIES times.
+    """
+    import dedup
+
+    index = index if index is not None else dedup.QuestionIndex()
+    seen = [block.split("\n", 1)[0] for block in banked]
+    index.add_many(seen)
+    questions = []
+    for attempt in range(1 + QUESTION_RETRIES):
+        needed = count - len(question_blocks(questions))
+        if needed <= 0:
+            break
+        try:
+            lines = await generate(needed, seen)
+        except Exception as e:
+            if not attempt:
+                raise
+            print(f"[{pipeline}] retry failed: {e}")
+            break
+        # One entry per question, without the "A)" preamble, so retries append cleanly
+        blocks = question_blocks(lines)
+        seen += [block.split("\n", 1)[0] for block in blocks]
+        with timed(pipeline, "dedup", len(blocks), "questions"):
+            questions += dedup.drop_near_duplicates(question_lines(blocks), index)
+    return questions
+
+@app.get("/api/question-bank/search")
+async def search_question_bank(q: str = "", chapter: str = "", type: Optional[str] = None,
+                               marks: Optional[int] = None, limit: int = 20):
+    limit = max(1, min(limit, 100))
+    try:
+        results = await run_io(question_bank.search, q, chapter, type, marks, limit)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid search: {e}")
+    return {"results": results}
+
 # --- Generate Questions from Text ---
-@app.post("/api/nlp-generate-questions")
-async def generate_questions(payload: TextIn):
+def build_questions_prompt(payload: TextIn, pipeline: str = "generate_questions", exclude: list[str] = ()) -> str:
     full_text = payload.text.strip()
     if not full_text:
         raise HTTPException(status_code=400, detail="No text provided.")
+    full_text = compact(full_text, PROMPT_BUDGET_TEXT, pipeline)
 
-    types = []
-    if payload.mcq: types.append("MCQ")
-    if payload.shortAnswer: types.append("short answer")
-    if payload.longAnswer: types.append("long answer")
-    if not types:
+    types_str = question_type(payload)
+    if not types_str:
         raise HTTPException(status_code=400, detail="Select at least one question type.")
-    types_str = ", ".join(types)
 
     n = payload.numQuestions
     # system_prompt = (
@@ -185,128 +410,156 @@ async def generate_questions(payload: TextIn):
         - If a question contains the exact phrase “which of the following”, do not include it or mention it in any way—omit it silently.
         - If a question contains the exact phrase “which of the following is NOT”, do not include it or mention it in any way—omit it silently.
     """.strip()
+    avoid = avoid_prompt(exclude)
+    return system_prompt + "\n\n" + avoid if avoid else system_prompt
 
-    try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(
-            system_prompt + "\n\n" + full_text,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,
-                max_output_tokens=400
-            )
-        )
-        content = response.text.strip()
-        # questions = [
-        #     line.lstrip("0123456789. ").strip() for line in content.split("\n") if line.strip()
-        # ]
-
-        questions = []
-        for line in content.split("\n"):
-            line = line.strip()
-            if not line:
-                continue
-            # Robust removal of Q1, Q 1., 1., 1) etc.
-            cleaned_line = re.sub(r"^(Q?\s*\d+\s*[\.\)\-:]?\s*)", "", line, flags=re.IGNORECASE)
-            questions.append(cleaned_line)
-
-        return {"questions": questions}
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Gemini API error: {e}")
+# Robust removal of Q1, Q 1., 1., 1) etc.
+QUESTION_NUMBER_PATTERN = re.compile(r"^(Q?\s*\d+\s*[\.\)\-:]?\s*)", flags=re.IGNORECASE)
+
+def clean_question_line(line: str) -> str:
+    return QUESTION_NUMBER_PATTERN.sub("", line.strip())
+
+@app.post("/api/nlp-generate-questions")
+async def generate_questions(payload: TextIn):
+    prompt = build_questions_prompt(payload)
+    text_hash = source_hash(payload.text)
+    qtype = question_type(payload)
+    banked = []
+    if payload.fromBank:
+        banked = await bank_take(text_hash, payload.numQuestions, type=qtype)
+        if len(banked) >= payload.numQuestions:
+            return {"questions": question_lines(banked)}
+
+    async def generate(count: int, exclude: list[str]) -> list[str]:
+        request = prompt if count == payload.numQuestions and not exclude else build_questions_prompt(
+            payload.model_copy(update={"numQuestions": count}), exclude=exclude)
+        try:
+            content = await generate_cached(request, temperature=0.7, max_output_tokens=400, pipeline="generate_questions")
+            # questions = [
+            #     line.lstrip("0123456789. ").strip() for line in content.split("\n") if line.strip()
+            # ]
+
+            with timed("generate_questions", "parse") as stage:
+                questions = [clean_question_line(line) for line in content.split("\n") if line.strip()]
+                stage.record_size(len(questions), "questions")
+        except Exception as e:
+            raise gemini_error(e)
+        return questions
+
+    questions = await fill_questions(payload.numQuestions - len(banked), generate, banked, "generate_questions")
+    await bank_store(question_blocks(questions), "text", text_hash, type=qtype)
+    return {"questions": question_lines(banked) + questions}
 
 # --- Generate Answer ---
+ANSWER_SYSTEM_PROMPT = (
+    "You are an expert tutor. "
+    "Provide a clear, concise answer to the question below."
+)
+
 @app.post("/api/generate-answer")
 async def generate_answer(req: AnswerRequest):
     question = req.question.strip()
     if not question:
         raise HTTPException(status_code=400, detail="Question is required.")
 
-    system_prompt = (
-        "You are an expert tutor. "
-        "Provide a clear, concise answer to the question below."
-    )
-
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(
-            system_prompt + "\n\n" + question,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,
-                max_output_tokens=300
-            )
-        )
-        answer_text = response.text.strip()
+        answer_text = await generate_cached(ANSWER_SYSTEM_PROMPT + "\n\n" + question, temperature=0.7, max_output_tokens=300, pipeline="generate_answer")
         return {"answer": answer_text}
     except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Gemini API error: {e}")
-
-
-
-
-def extract_text_from_pdf(path: str) -> str:
-    text_chunks = []
-    try:
-        doc = fitz.open(path)
-        for page in doc:
-            chunk = page.get_text()
-            if chunk:
-                text_chunks.append(chunk)
-    except Exception as e:
-        print(f"[native PDF extract] error: {e}")
-
-    full_text = "\n".join(text_chunks).strip()
-    if not full_text:
-        print("→ No native text found – falling back to OCR on PDF pages")
-        try:
-            pages = convert_from_path(path, dpi=300)
-            ocr_texts = []
-            for img in pages:
-                img = img.convert('L')  # Convert to grayscale
-                img = ImageEnhance.Contrast(img).enhance(2.0)  # Increase contrast
-                ocr_text = pytesseract.image_to_string(img).strip()
-                ocr_texts.append(ocr_text)
-            full_text = "\n".join(ocr_texts).strip()
-        except Exception as e:
-            print(f"[PDF OCR] error: {e}")
-    return full_text
+        raise gemini_error(e)
+
+# --- Generate Answers in Batch ---
+ANSWER_BATCH_MAX_ITEMS = int(os.environ.get("ANSWER_BATCH_MAX_ITEMS", 100))
+ANSWER_BATCH_CONCURRENCY = int(os.environ.get("ANSWER_BATCH_CONCURRENCY", 8))
+
+class AnswerBatchRequest(BaseModel):
+    items: list[AnswerRequest]
+
+@app.post("/api/generate-answers")
+async def generate_answers(req: AnswerBatchRequest):
+    """ Answer many questions in one round trip; failed items don't sink the batch """
+    if not req.items:
+        raise HTTPException(status_code=400, detail="At least one question is required.")
+    if len(req.items) > ANSWER_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {ANSWER_BATCH_MAX_ITEMS} questions per batch.")
+
+    semaphore = asyncio.Semaphore(ANSWER_BATCH_CONCURRENCY)
+    answers: dict[int, str] = {}
+    errors: dict[int, str] = {}
+
+    async def answer_one(idx: int, item: AnswerRequest):
+        question = item.question.strip()
+        if not question:
+            errors[idx] = "Question is required."
+            return
+        async with semaphore:
+            try:
+                answers[idx] = await generate_cached(ANSWER_SYSTEM_PROMPT + "\n\n" + question, temperature=0.7, max_output_tokens=300, pipeline="generate_answers")
+            except Exception as e:
+                errors[idx] = f"Gemini API error: {e}"
 
-def extract_text_from_image(path: str) -> str:
-    try:
-        img = Image.open(path)
-        img = img.convert('L')  # Convert to grayscale
-        img = ImageEnhance.Contrast(img).enhance(2.0)  # Increase contrast
-        text = pytesseract.image_to_string(img).strip()
-        return text
-    except Exception as e:
-        print(f"[image OCR] error: {e}")
-        return ""
+    await asyncio.gather(*[answer_one(idx, item) for idx, item in enumerate(req.items)])
+    return {"answers": dict(sorted(answers.items())), "errors": dict(sorted(errors.items()))}
 
 
 # --- Upload Question Paper ---
-
-@app.post("/api/upload-question-paper")
-async def upload_question_paper(file: UploadFile = File(...)):
-    """ Upload PDF/JPEG → Extract Questions → Return JSON """
-    suffix = os.path.splitext(file.filename)[1].lower()
-    if suffix not in [".pdf", ".jpg", ".jpeg"]:
-        raise HTTPException(status_code=400, detail="Unsupported file type")
-
-    # Save upload to temp file
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            contents = await file.read()
-            tmp.write(contents)
-            tmp_path = tmp.name
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"File save error: {e}")
-
-    # Extract text (PDF → native or OCR; image → OCR)
-    try:
-        if suffix == ".pdf":
-            raw_text = extract_text_from_pdf(tmp_path)
-        else:
-            raw_text = extract_text_from_image(tmp_path)
-    finally:
-        os.remove(tmp_path)
+# Every OCR'd PDF page is its own process-pool task, so the pool is the one
+# OCR budget for the whole server: CPU_WORKERS pages at a time across all
+# uploads. A document keeps at most CPU_WORKERS of its pages queued, so a long
+# scan doesn't hold up the uploads that arrive after it.
+async def extract_pdf(path: str, job: Job | None = None) -> str:
+    """ extract_text_from_pdf with the OCR pages spread over the process pool, reporting them to the job """
+    import extraction
+
+    page_texts, ocr_page_numbers = await run_cpu(extraction.native_pdf_pages, path)
+    done = len(page_texts) - len(ocr_page_numbers)
+    if job is not None:
+        job.progress(done, len(page_texts))
+    if not ocr_page_numbers:
+        return "\n".join(t for t in page_texts if t).strip()
+
+    print(f"→ OCR on {len(ocr_page_numbers)} of {len(page_texts)} PDF pages")
+    slots = asyncio.Semaphore(CPU_WORKERS)
+
+    async def ocr_one(number: int):
+        nonlocal done
+        async with slots:
+            try:
+                ocr_texts = await run_cpu(extraction.ocr_pdf_pages, path, workers=1, page_numbers=[number])
+            except Exception as e:
+                print(f"[PDF OCR] error: {e}")
+                ocr_texts = []
+        if ocr_texts and ocr_texts[0]:
+            page_texts[number] = ocr_texts[0]
+        done += 1
+        if job is not None:
+            job.progress(done, len(page_texts))
+
+    with timed("extraction", "pdf_ocr", len(ocr_page_numbers), "pages"):
+        await asyncio.gather(*(ocr_one(number) for number in ocr_page_numbers))
+    return "\n".join(t for t in page_texts if t).strip()
+
+async def questions_from_paper(tmp_path: str, file_hash: str, suffix: str, size: int, job: Job | None = None) -> list[str]:
+    """ Saved upload → extracted text → questions; shared by the direct and job endpoints """
+    import extraction
+
+    # Repeat uploads are served from the extraction cache
+    cache_key = extraction_cache.key(file_hash, extraction.extraction_settings(suffix))
+    cached = await run_io(extraction_cache.get, cache_key) or {}
+    if cached.get("questions"):
+        return cached["questions"]
+
+    raw_text = cached.get("text", "")
+    if not raw_text:
+        # Extract text (PDF → native or OCR; image → OCR)
+        with timed("upload_question_paper", "extract", size, "bytes"):
+            if suffix == ".pdf":
+                raw_text = await extract_pdf(tmp_path, job)
+            else:
+                raw_text = await run_cpu(extraction.extract_text_from_image, tmp_path)
+
+        if raw_text.strip():
+            await run_io(extraction_cache.put, cache_key, text=raw_text)
 
     if not raw_text.strip():
         raise HTTPException(status_code=500, detail="Could not extract any text from file.")
@@ -334,15 +587,17 @@ async def upload_question_paper(file: UploadFile = File(...)):
         Return ONLY a valid JSON object. Do not include commentary or markdown.
         """.strip()
 
+    if job is not None:
+        job.update(stage="parse")
+
     # Call Gemini
     questions: list[str] = []  # ← initialize here
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content([
-            {"role": "user", "parts": [{"text": system_prompt}]},
-            {"role": "user", "parts": [{"text": raw_text}]}
-        ])
-        resp_content = response.text.strip()
+        with timed("upload_question_paper", "gemini", len(system_prompt) + len(raw_text), "chars"):
+            resp_content = await llm.generate([
+                {"role": "user", "parts": [{"text": system_prompt}]},
+                {"role": "user", "parts": [{"text": raw_text}]}
+            ])
         print(f"[Gemini returned] >>>{resp_content}<<<")
 
         # strip any ```json fences
@@ -351,11 +606,15 @@ async def upload_question_paper(file: UploadFile = File(...)):
 
         if resp_clean.startswith("{"):
             try:
-                obj = json.loads(resp_clean)
-                questions = [
-                    q.strip() for q in obj.get("questions", [])
-                    if isinstance(q, str) and q.strip()
-                ]
+                with timed("upload_question_paper", "parse_json", len(resp_clean), "chars"):
+                    obj = json.loads(resp_clean)
+                    questions = [
+                        q.strip() for q in obj.get("questions", [])
+                        if isinstance(q, str) and q.strip()
+                    ]
+                # Only a clean Gemini parse is cached; regex fallbacks get retried next time
+                if questions:
+                    await run_io(extraction_cache.put, cache_key, questions=questions)
             except json.JSONDecodeError as je:
                 print(f"[JSONDecodeError] {je}")
         else:
@@ -366,80 +625,150 @@ async def upload_question_paper(file: UploadFile = File(...)):
 
     # Fallback regex if necessary
     if not questions:
-        fallback_matches = re.findall(
-            r'(\d+\.\s+.*?(?=\n\d+\.|\Z))|(\([a-z]\)\s+.*?(?=\n\([a-z]\)|\n\d+\.|\Z))',
-            raw_text,
-            flags=re.S | re.I
-        )
+        with timed("upload_question_paper", "parse_regex", len(raw_text), "chars"):
+            fallback_matches = re.findall(
+                r'(\d+\.\s+.*?(?=\n\d+\.|\Z))|(\([a-z]\)\s+.*?(?=\n\([a-z]\)|\n\d+\.|\Z))',
+                raw_text,
+                flags=re.S | re.I
+            )
         questions = [m[0] or m[1] for m in fallback_matches if m[0] or m[1]]
         print(f"[Fallback regex found] {len(questions)} questions")
 
     if not questions:
         raise HTTPException(status_code=500, detail="Could not extract questions from paper.")
 
+    await bank_store(questions, "question_paper", file_hash)
+    return questions
+
+@app.post("/api/upload-question-paper")
+async def upload_question_paper(file: UploadFile = File(...)):
+    """ Upload PDF/JPEG → Extract Questions → Return JSON """
+    suffix = os.path.splitext(file.filename)[1].lower()
+    if suffix not in [".pdf", ".jpg", ".jpeg"]:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+
+    # Save upload to temp file, hashing it on the way
+    tmp_path, file_hash, size = await save_upload(file, suffix, "upload_question_paper")
+    try:
+        questions = await questions_from_paper(tmp_path, file_hash, suffix, size)
+    finally:
+        os.remove(tmp_path)
     return {"questions": questions}
 
+# --- Background Jobs ---
+# Same pipeline as /api/upload-question-paper, but the request returns a job id
+# straight away and the work runs on the job queue's workers
+JOB_EVENT_KEEPALIVE = 15
+
+@app.post("/api/upload-question-paper/jobs", status_code=202)
+async def submit_question_paper_job(file: UploadFile = File(...)):
+    suffix = os.path.splitext(file.filename)[1].lower()
+    if suffix not in [".pdf", ".jpg", ".jpeg"]:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+
+    tmp_path, file_hash, size = await save_upload(file, suffix, "upload_question_paper")
+
+    async def run(job: Job) -> dict:
+        try:
+            job.update(stage="extract")
+            return {"questions": await questions_from_paper(tmp_path, file_hash, suffix, size, job)}
+        finally:
+            os.remove(tmp_path)
+
+    try:
+        job = job_queue.submit("question_paper", run)
+    except QueueFull:
+        os.remove(tmp_path)
+        raise HTTPException(status_code=503, detail="Too many jobs queued. Try again later.")
+    return {"job_id": job.id, "status": job.status}
+
+def get_job(job_id: str) -> Job:
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return job
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str):
+    return get_job(job_id).to_dict()
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """ SSE: the job's state on every change (and as a keepalive) until it finishes """
+    job = get_job(job_id)
+
+    async def events():
+        while True:
+            changed = job.watch()
+            state = job.to_dict()
+            if job.status in TERMINAL_STATUSES:
+                yield sse_event(state, event=job.status)
+                return
+            yield sse_event(state)
+            try:
+                await asyncio.wait_for(changed.wait(), JOB_EVENT_KEEPALIVE)
+            except asyncio.TimeoutError:
+                pass
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 
 
 # --- Upload Syllabus ---
 @app.post("/api/upload-syllabus")
-async def upload_syllabus(file: UploadFile = File(...)):
+async def upload_syllabus(file: UploadFile = File(...), x_session_id: str = Header(DEFAULT_SESSION)):
     suffix = os.path.splitext(file.filename)[1].lower()
     if suffix not in [".pdf", ".jpg", ".jpeg"]:
         raise HTTPException(status_code=400, detail="Unsupported file type. Only PDF, JPG or JPEG allowed.")
 
-    contents = await file.read()
-    if suffix == ".pdf":
-        with open(TEMP_PDF, "wb") as f:
-            f.write(contents)
-        text = extract_text_from_pdf(TEMP_PDF)
-        if not text.strip():
-            text = extract_text_from_image(TEMP_PDF)
-    else:
-        image_path = f"temp_syllabus_image{suffix}"
-        with open(image_path, "wb") as f:
-            f.write(contents)
-        text = extract_text_from_image(image_path)
-        os.remove(image_path)
+    import extraction
 
+    tmp_path, file_hash, size = await save_upload(file, suffix, "upload_syllabus")
+    try:
+        cache_key = extraction_cache.key(file_hash, extraction.extraction_settings(suffix))
+        cached = await run_io(extraction_cache.get, cache_key) or {}
+        text = cached.get("text", "")
+        if not text:
+            with timed("upload_syllabus", "extract", size, "bytes"):
+                if suffix == ".pdf":
+                    text = await extract_pdf(tmp_path)
+                    if not text.strip():
+                        text = await run_cpu(extraction.extract_text_from_image, tmp_path)
+                else:
+                    text = await run_cpu(extraction.extract_text_from_image, tmp_path)
+
+            if text.strip():
+                await run_io(extraction_cache.put, cache_key, text=text)
+    finally:
+        os.remove(tmp_path)
+
+    # Cleaned once here, so every prompt built from the syllabus starts clean
+    with timed("upload_syllabus", "normalize", len(text), "chars"):
+        text = normalize_text(text)
     if not text.strip():
         raise HTTPException(status_code=500, detail="Could not extract any text from file.")
-    with open(SYLLABUS_TXT, "w", encoding="utf-8") as f:
-        f.write(text)
+    with timed("upload_syllabus", "index", len(text), "chars"):
+        syllabus_store.put(x_session_id, text)
+    if x_session_id == DEFAULT_SESSION:
+        await run_io(Path(SYLLABUS_TXT).write_text, text, encoding="utf-8")
 
     return {"text": text}
 
 # --- Generate Questions by Chapter ---
-@app.post("/api/nlp-generate-questions-by-chapter")
-async def generate_questions_by_chapter(payload: ChapterIn):
+def chapter_prompt(payload: ChapterIn, chapter_content: str | None, pipeline: str = "generate_by_chapter",
+                   exclude: list[str] = ()) -> str:
+    """ Prompt for one chapter spec, given its slice of the syllabus """
     chapter = payload.chapter.strip()
     n = payload.numQuestions
-    types = []
-    if payload.mcq: types.append("MCQ")
-    if payload.shortAnswer: types.append("short answer")
-    if payload.longAnswer: types.append("long answer")
-    if not types:
+    types_str = question_type(payload)
+    if not types_str:
         raise HTTPException(status_code=400, detail="Select at least one question type.")
-    types_str = ", ".join(types)
 
     if not chapter:
         raise HTTPException(status_code=400, detail="Chapter name is required.")
-    try:
-        syllabus_text = open(SYLLABUS_TXT, "r", encoding="utf-8").read()
-    except FileNotFoundError:
-        raise HTTPException(status_code=400, detail="No syllabus uploaded.")
-
-    text_lower = syllabus_text.lower()
-    start_idx = text_lower.find(chapter.lower())
-    if start_idx == -1:
+    if chapter_content is None:
         raise HTTPException(status_code=404, detail="Chapter not found in syllabus.")
-
-    next_units = [
-        m.start() for m in re.finditer(r"(?:unit[\s\-]*\d+\b)", text_lower)
-        if m.start() > start_idx
-    ]
-    end_idx = next_units[0] if next_units else len(syllabus_text)
-    chapter_content = syllabus_text[start_idx:end_idx].strip()
+    chapter_content = compact(chapter_content, PROMPT_BUDGET_CHAPTER, pipeline, normalize=False)
 
     # system_prompt = (
     #     f"You are an expert question generator. Based on the following syllabus section, "
@@ -462,36 +791,203 @@ async def generate_questions_by_chapter(payload: ChapterIn):
         - If a question contains the exact phrase “which of the following”, do not include it or mention it in any way—omit it silently.
         - If a question contains the exact phrase “which of the following is NOT”, do not include it or mention it in any way—omit it silently.
     """.strip()
+    avoid = avoid_prompt(exclude)
+    if avoid:
+        system_prompt += "\n\n" + avoid
+    return system_prompt + "\n\n" + chapter_content
+
+def build_chapter_prompt(payload: ChapterIn, session_id: str) -> str:
+    syllabus = session_syllabus(session_id)
+    chapter = payload.chapter.strip()
+    return chapter_prompt(payload, syllabus.chapter(chapter) if chapter else None, "generate_by_chapter_stream")
 
+async def generate_chapter_questions(prompt: str, pipeline: str) -> list[str]:
+    """ One uncached Gemini call for a chapter prompt; raises HTTPException(502) on failure """
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(
-            system_prompt + "\n\n" + chapter_content,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,
-                max_output_tokens=300
-            )
-        )
-        raw = response.text.strip()
-        questions = [
-            line.lstrip("0123456789. ").strip()
-            for line in raw.split("\n") if line.strip()
-        ]
-        return {"chapter": chapter, "questions": questions}
+        with timed(pipeline, "gemini", len(prompt), "chars"):
+            raw = await llm.generate(prompt, temperature=0.7, max_output_tokens=300)
     except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Gemini API error: {e}")
+        raise gemini_error(e)
+    return [
+        line.lstrip("0123456789. ").strip()
+        for line in raw.split("\n") if line.strip()
+    ]
+
+async def chapter_questions(payload: ChapterIn, chapter_content: str | None, pipeline: str,
+                            index: "dedup.QuestionIndex | None" = None) -> list[str]:
+    """ Questions for one chapter, from the bank first when asked, stored back in the bank
+
+    With ``index`` (the questions of a whole paper) near-duplicates of it are replaced too.
+    """
+    prompt = chapter_prompt(payload, chapter_content, pipeline)
+    chapter_hash = source_hash(chapter_content)
+    qtype = question_type(payload)
+    banked = []
+    if payload.fromBank:
+        banked = await bank_take(chapter_hash, payload.numQuestions, type=qtype)
+        if len(banked) >= payload.numQuestions:
+            if index is not None:
+                index.add_many([block.split("\n", 1)[0] for block in banked])
+            return question_lines(banked)
+
+    async def generate(count: int, exclude: list[str]) -> list[str]:
+        if count == payload.numQuestions and not exclude:
+            return await generate_chapter_questions(prompt, pipeline)
+        return await generate_chapter_questions(
+            chapter_prompt(payload.model_copy(update={"numQuestions": count}), chapter_content, pipeline, exclude),
+            pipeline)
+
+    questions = await fill_questions(payload.numQuestions - len(banked), generate, banked, pipeline, index)
+    await bank_store(question_blocks(questions), "chapter", chapter_hash, chapter=payload.chapter, type=qtype)
+    return question_lines(banked) + questions
+
+@app.post("/api/nlp-generate-questions-by-chapter")
+async def generate_questions_by_chapter(payload: ChapterIn, x_session_id: str = Header(DEFAULT_SESSION)):
+    chapter = payload.chapter.strip()
+    with timed("generate_by_chapter", "build_prompt"):
+        syllabus = session_syllabus(x_session_id)
+        chapter_content = syllabus.chapter(chapter) if chapter else None
+    questions = await chapter_questions(payload, chapter_content, "generate_by_chapter")
+    return {"chapter": chapter, "questions": questions}
+
+# --- Generate Questions for Many Chapters ---
+# A whole exam's chapter specs in one request: the syllabus is scanned once
+# for all chapter names and the chapters are generated concurrently (at most
+# CHAPTER_BATCH_CONCURRENCY Gemini calls at a time). A failed chapter is
+# reported in its slot and doesn't sink the batch.
+CHAPTER_BATCH_MAX_ITEMS = int(os.environ.get("CHAPTER_BATCH_MAX_ITEMS", 30))
+CHAPTER_BATCH_CONCURRENCY = int(os.environ.get("CHAPTER_BATCH_CONCURRENCY", 8))
+
+class ChapterBatchIn(BaseModel):
+    chapters: list[ChapterIn]
+
+def chapter_batch_tasks(req: ChapterBatchIn, session_id: str, pipeline: str) -> list:
+    """ Validate the batch and return one awaitable per chapter, in request order """
+    if not req.chapters:
+        raise HTTPException(status_code=400, detail="At least one chapter is required.")
+    if len(req.chapters) > CHAPTER_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {CHAPTER_BATCH_MAX_ITEMS} chapters per batch.")
+    syllabus = session_syllabus(session_id)
+    with timed(pipeline, "slice", len(req.chapters), "chapters"):
+        contents = syllabus.chapters([item.chapter.strip() for item in req.chapters])
+
+    import dedup
+
+    semaphore = asyncio.Semaphore(CHAPTER_BATCH_CONCURRENCY)
+    # Questions kept so far across the batch; a chapter repeating another's asks again
+    paper = dedup.QuestionIndex()
+
+    async def generate_one(idx: int, item: ChapterIn) -> dict:
+        chapter = item.chapter.strip()
+        try:
+            async with semaphore:
+                questions = await chapter_questions(item, contents.get(chapter), pipeline, paper)
+        except HTTPException as e:
+            return {"index": idx, "chapter": chapter, "error": e.detail, "status": e.status_code}
+        return {"index": idx, "chapter": chapter, "questions": questions}
+
+    return [generate_one(idx, item) for idx, item in enumerate(req.chapters)]
+
+@app.post("/api/nlp-generate-questions-by-chapters")
+async def generate_questions_by_chapters(req: ChapterBatchIn, x_session_id: str = Header(DEFAULT_SESSION)):
+    tasks = chapter_batch_tasks(req, x_session_id, "generate_by_chapters")
+    return {"results": await asyncio.gather(*tasks)}
+
+@app.post("/api/nlp-generate-questions-by-chapters/stream")
+async def generate_questions_by_chapters_stream(req: ChapterBatchIn, x_session_id: str = Header(DEFAULT_SESSION)):
+    """ One SSE event per chapter as it finishes ("chapter" or "error"), then "done" """
+    tasks = chapter_batch_tasks(req, x_session_id, "generate_by_chapters_stream")
+
+    async def events():
+        pending = [asyncio.ensure_future(task) for task in tasks]
+        try:
+            failed = 0
+            for next_result in asyncio.as_completed(pending):
+                result = await next_result
+                failed += "error" in result
+                yield sse_event(result, event="error" if "error" in result else "chapter")
+            yield sse_event({"count": len(tasks), "failed": failed}, event="done")
+        finally:
+            # Client gone: stop the chapters still generating
+            for task in pending:
+                task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+# --- Streaming Question Generation (Server-Sent Events) ---
+def sse_event(data: dict, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+async def stream_questions(prompt: str, max_output_tokens: int, extra: dict | None = None, pipeline: str = "stream"):
+    """ Yield an SSE event per cleaned question as soon as its line completes """
+    extra = extra or {}
+    count = 0
+    start = time.perf_counter()
+    import dedup
+
+    # Near-duplicates of questions already sent are skipped, with their MCQ choices
+    seen = dedup.QuestionIndex()
+    keep = True
+
+    def is_fresh(question: str) -> bool:
+        nonlocal keep
+        if not OPTION_LINE.match(question):
+            keep = seen.add_unique([question])[0]
+        return keep
+
+    try:
+        pending = ""
+        async for text in llm.stream(prompt, temperature=0.7, max_output_tokens=max_output_tokens):
+            pending += text
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                if line.strip() and is_fresh(clean_question_line(line)):
+                    count += 1
+                    if count == 1:
+                        metrics.observe(pipeline, "first_question", time.perf_counter() - start)
+                    yield sse_event({**extra, "question": clean_question_line(line)})
+        if pending.strip() and is_fresh(clean_question_line(pending)):
+            count += 1
+            yield sse_event({**extra, "question": clean_question_line(pending)})
+        metrics.observe(pipeline, "gemini", time.perf_counter() - start, count, "questions")
+        yield sse_event({**extra, "count": count}, event="done")
+    except Exception as e:
+        yield sse_event({**extra, "detail": f"Gemini API error: {e}"}, event="error")
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+@app.post("/api/nlp-generate-questions/stream")
+async def generate_questions_stream(payload: TextIn):
+    prompt = build_questions_prompt(payload, "generate_questions_stream")
+    return StreamingResponse(
+        stream_questions(prompt, max_output_tokens=400, pipeline="generate_questions_stream"),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+@app.post("/api/nlp-generate-questions-by-chapter/stream")
+async def generate_questions_by_chapter_stream(payload: ChapterIn, x_session_id: str = Header(DEFAULT_SESSION)):
+    prompt = build_chapter_prompt(payload, x_session_id)
+    return StreamingResponse(
+        stream_questions(prompt, max_output_tokens=300, extra={"chapter": payload.chapter.strip()},
+                         pipeline="generate_by_chapter_stream"),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
 
 # --- Generate Answer to Question ---
 @app.post("/api/nlp-generate-answer-to-question")
-async def generate_answer_to_question(payload: QuestionIn):
+async def generate_answer_to_question(payload: QuestionIn, x_session_id: str = Header(DEFAULT_SESSION)):
     user_question = payload.question.strip()
     if not user_question:
         raise HTTPException(status_code=400, detail="Question is required.")
 
-    try:
-        syllabus_text = open(SYLLABUS_TXT, "r", encoding="utf-8").read()
-    except FileNotFoundError:
-        raise HTTPException(status_code=400, detail="No syllabus uploaded.")
+    syllabus = session_syllabus(x_session_id)
+    # Only the chunks relevant to the question go into the prompt
+    with timed("answer_to_question", "retrieve"):
+        syllabus_text = syllabus.context_for(user_question)
+    syllabus_text = compact(syllabus_text, PROMPT_BUDGET_ANSWER, "answer_to_question", normalize=False)
 
     system_prompt = (
         "You are an expert academic assistant. Using the provided syllabus content, "
@@ -500,18 +996,15 @@ async def generate_answer_to_question(payload: QuestionIn):
     )
 
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(
+        answer = await generate_cached(
             system_prompt + f"\n\nSyllabus content:\n\n{syllabus_text}\n\nUser question: {user_question}",
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.3,
-                max_output_tokens=400
-            )
+            temperature=0.3,
+            max_output_tokens=400,
+            pipeline="answer_to_question"
         )
-        answer = response.text.strip()
         return {"question": user_question, "answer": answer}
     except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Gemini API error: {e}")
+        raise gemini_error(e)
 
 # --- Export PDF ---
 # @app.post("/api/export-pdf")
@@ -573,82 +1066,89 @@ async def export_pdf(request: Request):
     data = await request.json()
     questions = data.get("questions", [])
 
-    pdf_path = "generated_questions.pdf"
-    doc = SimpleDocTemplate(pdf_path, pagesize=A4,
-                             rightMargin=40, leftMargin=40,
-                             topMargin=50, bottomMargin=50)
-
-    styles = getSampleStyleSheet()
-    title_style = styles["Title"]
-
-    # Styles
-    question_style_normal = ParagraphStyle(
-        "QuestionNormal",
-        parent=styles["BodyText"],
-        leftIndent=0,
-        spaceAfter=6,
-        fontName="Helvetica"
-    )
+    import paper
 
-    question_style_bold = ParagraphStyle(
-        "QuestionBold",
-        parent=styles["BodyText"],
-        leftIndent=0,
-        spaceAfter=6,
-        fontName="Helvetica-Bold"
+    with timed("export_pdf", "render", len(questions), "questions"):
+        pdf_bytes = await run_cpu(paper.build_question_paper, questions)
+    return StreamingResponse(
+        io.BytesIO(pdf_bytes),
+        media_type="application/pdf",
+        headers={"Content-Disposition": "attachment; filename=generated_questions.pdf"}
     )
 
-    answer_style = ParagraphStyle(
-        "Answer",
-        parent=styles["BodyText"],
-        leftIndent=15,
-        spaceAfter=4,
-        fontName="Helvetica"
-    )
 
-    elements = []
-    elements.append(Paragraph("Generated Question Paper", title_style))
-    elements.append(Spacer(1, 12))
+# Pydantic model for mock test request
+class MockTestItem(BaseModel):
+    numQuestions: int
+    marks: int
 
-    # Go through each question
-    for q in questions:
-        text = q.get("question", "").replace("\n", "<br/>")
-        marks = q.get("marks", "")
+class MockTestRequest(BaseModel):
+    mocktestRequests: list[MockTestItem]
+    fromBank: bool = False
 
-        # Check if ends with ?
-        style = question_style_bold if text.strip().endswith('?') else question_style_normal
+# Function to generate questions using Gemini API
+import traceback
 
-        q_text = f"{text}"
-        if marks:
-            q_text += f" <i>({marks} marks)</i>"
+# Short sections are re-requested (only their shortfall) this many times
+MOCK_SECTION_RETRIES = int(os.environ.get("MOCK_SECTION_RETRIES", 2))
+
+def parse_mock_questions(content: str, marks: int) -> list[dict]:
+    questions = []
+    for line in content.split("\n"):
+        line = line.strip()
+        if not line or line.lower().startswith("a)"):
+            continue
+        # Extract question and marks
+        match = re.match(r"^(.*?)\s*\((\d+)\s*marks?\)$", line, re.IGNORECASE)
+        if match and int(match.group(2)) == marks:
+            question_text = match.group(1).strip()
+            # Remove numbering or lettering
+            cleaned_question = re.sub(r"^(Q?\s*\d+\s*[\.\)\-:]?\s*)|^\([a-z]\)\s*", "", question_text, flags=re.IGNORECASE)
+            if cleaned_question:
+                questions.append({"question": cleaned_question, "marks": marks})
+    return questions
+
+def mock_question_type(marks: int) -> str:
+    return "short answer" if marks <= 2 else "long answer"
+
+async def generate_mock_section(syllabus_text: str, marks: int, count: int, exclude: list[str]) -> list[dict]:
+    question_type = mock_question_type(marks)
+    avoid = avoid_prompt(exclude)
 
-        # Add the question (NO numbering)
-        elements.append(Paragraph(q_text, style))
+    system_prompt = f"""
+        You are an expert question paper generator. Based on the following syllabus text,
+        generate {count} unique {question_type} question{'s' if count > 1 else ''} for {marks} marks.
 
-        # If answer/choices present, show directly below (NO numbering)
-        raw_answer = q.get("answer")
-        answer = raw_answer.strip() if isinstance(raw_answer, str) else ""
-        if answer:
-            for line in answer.split("\n"):
-                elements.append(Paragraph(line.strip(), answer_style))
+        Requirements:
+        - Ensure all questions are distinct and do not repeat.
+        - For 1-2 marks, generate concise short-answer questions (1-2 sentences).
+        - For 5+ marks, generate detailed long-answer questions requiring explanation or comparison.
+        - Format each question with its marks in parentheses, e.g., "Question text ({marks} marks)".
+        - Do not include commentary or preamble unless it starts with “A)”.
 
-        elements.append(Spacer(1, 6))  # small gap between Qs
+        Formatting rule for code snippets:
+        - Whenever you wrap any part of a question in triple-backticks (```), keep the entire fence and its contents on the **same line** as the question.
+        - Do NOT break the triple-backticks onto their own lines.
 
-    doc.build(elements)
-    return FileResponse(pdf_path, media_type="application/pdf", filename=pdf_path)
+        {avoid}
 
+        Syllabus:
+        {syllabus_text}
+    """.strip()
 
-# Pydantic model for mock test request
-class MockTestItem(BaseModel):
-    numQuestions: int
-    marks: int
+    with timed("mock_test", "gemini", count, "questions"):
+        content = await llm.generate(
+            system_prompt + "\n\nGenerate the questions based on the syllabus.",
+            temperature=0.7,
+            max_output_tokens=max(1000, count * 100)  # each section gets its own budget
+        )
+    with timed("mock_test", "parse", len(content), "chars"):
+        return parse_mock_questions(content, marks)[:count]
 
-class MockTestRequest(BaseModel):
-    mocktestRequests: list[MockTestItem]
+async def generate_mock_questions(requests: list[MockTestItem], session_id: str = DEFAULT_SESSION,
+                                  from_bank: bool = False) -> list[dict]:
+    import dedup
 
-# Function to generate questions using Gemini API
-import traceback
-def generate_mock_questions(requests: list[MockTestItem]) -> list[dict]:
     try:
         # Validate requests
         for req in requests:
@@ -656,103 +1156,81 @@ def generate_mock_questions(requests: list[MockTestItem]) -> list[dict]:
                 raise HTTPException(status_code=400, detail="numQuestions and marks must be positive.")
 
         # Read syllabus
-        try:
-            with open(SYLLABUS_TXT, "r", encoding="utf-8") as f:
-                syllabus_text = f.read()
-                print(f"Syllabus content: {syllabus_text[:100]}...")
-        except FileNotFoundError:
-            raise HTTPException(status_code=400, detail="No syllabus uploaded.")
+        syllabus_text = session_syllabus(session_id).text
+        print(f"Syllabus content: {syllabus_text[:100]}...")
 
         if not syllabus_text.strip():
             raise HTTPException(status_code=400, detail="Syllabus is empty.")
 
-        # Build prompt for all questions
-        prompt_parts = []
-        total_questions = 0
-        for req in requests:
-            question_type = "short answer" if req.marks <= 2 else "long answer"
-            prompt_parts.append(
-                f"- {req.numQuestions} {question_type} question{'s' if req.numQuestions > 1 else ''} for {req.marks} marks"
-            )
-            total_questions += req.numQuestions
-
-        system_prompt = f"""
-            You are an expert question paper generator. Based on the following syllabus text,
-            generate the following unique questions:
-
-            {', '.join(prompt_parts)}
-
-            Requirements:
-            - Ensure all questions are distinct and do not repeat across sections.
-            - For 1-2 marks, generate concise short-answer questions (1-2 sentences).
-            - For 5+ marks, generate detailed long-answer questions requiring explanation or comparison.
-            - Format each question with its marks in parentheses, e.g., "Question text (X marks)".
-            - Do not include commentary or preamble unless it starts with “A)”.
-
-            Formatting rule for code snippets:
-            - Whenever you wrap any part of a question in triple-backticks (```), keep the entire fence and its contents on the **same line** as the question.
-            - Do NOT break the triple-backticks onto their own lines.
-
-            Syllabus:
-            {syllabus_text}
-        """.strip()
-
-        # Call Gemini
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(
-            system_prompt + "\n\nGenerate the questions based on the syllabus.",
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,
-                max_output_tokens=1000  # Increased to handle multiple questions
-            )
-        )
-        content = response.text.strip()
-        #print(f"Gemini raw response: {content}")
-
-        # Parse questions
-        questions = []
-        for line in content.split("\n"):
-            line = line.strip()
-            if not line or line.lower().startswith("a)"):
-                continue
-            # Extract question and marks
-            match = re.match(r"^(.*?)\s*\((\d+)\s*marks?\)$", line, re.IGNORECASE)
-            if match:
-                question_text = match.group(1).strip()
-                marks = int(match.group(2))
-                # Remove numbering or lettering
-                cleaned_question = re.sub(r"^(Q?\s*\d+\s*[\.\)\-:]?\s*)|^\([a-z]\)\s*", "", question_text, flags=re.IGNORECASE)
-                if cleaned_question:
-                    questions.append({"question": cleaned_question, "marks": marks})
-
-        # Validate question counts
-        question_counts = {}
+        # One section per marks value, generated concurrently
+        sections: dict[int, int] = {}
         for req in requests:
-            question_counts[req.marks] = req.numQuestions
-
-        filtered_questions = []
-        counts = {marks: 0 for marks in question_counts}
-        for q in questions:
-            marks = q["marks"]
-            if marks in counts and counts[marks] < question_counts.get(marks, 0):
-                filtered_questions.append(q)
-                counts[marks] += 1
-
-        #print(f"Parsed questions: {filtered_questions}")
-        if len(filtered_questions) < total_questions:
+            sections[req.marks] = sections.get(req.marks, 0) + req.numQuestions
+
+        syllabus_hash = source_hash(syllabus_text)
+        # Every section sends the syllabus again; cap it once for all of them
+        syllabus_text = compact(syllabus_text, PROMPT_BUDGET_MOCK, "mock_test", normalize=False)
+        generated: dict[int, list[dict]] = {marks: [] for marks in sections}
+        if from_bank:
+            banked = await asyncio.gather(*[
+                bank_take(syllabus_hash, sections[marks], type=mock_question_type(marks), marks=marks)
+                for marks in sections
+            ])
+            for marks, questions in zip(sections, banked):
+                generated[marks] = [{"question": q, "marks": marks} for q in questions]
+        paper = dedup.QuestionIndex()
+        paper.add_many([q["question"] for marks in generated for q in generated[marks]])
+        pending = [marks for marks in sorted(sections) if len(generated[marks]) < sections[marks]]
+        for attempt in range(1 + MOCK_SECTION_RETRIES):
+            results = await asyncio.gather(*[
+                generate_mock_section(
+                    syllabus_text, marks,
+                    sections[marks] - len(generated[marks]),
+                    [q["question"] for q in generated[marks]]
+                )
+                for marks in pending
+            ], return_exceptions=True)
+
+            for marks, result in zip(pending, results):
+                if isinstance(result, LLMUnavailable):
+                    raise result  # retrying won't help while the client refuses calls
+                if isinstance(result, Exception):
+                    print(f"[mock section {marks} marks] error: {result}")
+                    continue
+                # Near-duplicates of the paper so far are dropped and their sections retried
+                result = result[:sections[marks] - len(generated[marks])]
+                kept = paper.add_unique([q["question"] for q in result])
+                generated[marks].extend(q for q, keep in zip(result, kept) if keep)
+
+            # Only the sections that came back short are retried
+            pending = [marks for marks in pending if len(generated[marks]) < sections[marks]]
+            if not pending:
+                break
+            print(f"→ Retrying short sections (marks): {pending}")
+
+        if pending:
             raise HTTPException(status_code=500, detail="Generated fewer questions than requested.")
 
-        return filtered_questions
+        await asyncio.gather(*[
+            bank_store([q["question"] for q in generated[marks]], "mock_test", syllabus_hash,
+                       type=mock_question_type(marks), marks=marks)
+            for marks in generated
+        ])
+        return [q for marks in sorted(generated) for q in generated[marks]]
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in generate_mock_questions: {str(e)}")
         traceback.print_exc()
-        raise HTTPException(status_code=502, detail=f"Gemini API error: {str(e)}")
+        raise gemini_error(e)
 
 @app.post("/api/export-mocktestpaper")
-async def export_mocktestpaper(request: MockTestRequest):
+async def export_mocktestpaper(request: MockTestRequest, x_session_id: str = Header(DEFAULT_SESSION)):
     try:
         # Generate all questions in one call
-        all_questions = generate_mock_questions(request.mocktestRequests)
+        with timed("mock_test", "generate") as stage:
+            all_questions = await generate_mock_questions(request.mocktestRequests, x_session_id, request.fromBank)
+            stage.record_size(len(all_questions), "questions")
 
         if not all_questions:
             raise HTTPException(status_code=400, detail="No questions generated.")
@@ -762,58 +1240,10 @@ async def export_mocktestpaper(request: MockTestRequest):
         grouped_questions = {k: list(g) for k, g in groupby(sorted_questions, key=itemgetter('marks'))}
         #print(f"Grouped questions: {grouped_questions}")
 
-        # Create a buffer for the PDF
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-        styles = getSampleStyleSheet()
-
-        # Define custom styles
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Heading1'],
-            fontSize=16,
-            spaceAfter=20,
-            alignment=TA_LEFT
-        )
-        section_style = ParagraphStyle(
-            'Section',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceAfter=12,
-            spaceBefore=12,
-            alignment=TA_LEFT
-        )
-        question_style = ParagraphStyle(
-            'Question',
-            parent=styles['Normal'],
-            fontSize=12,
-            spaceAfter=12,
-            leading=14,
-            alignment=TA_LEFT
-        )
-
-        # Build the PDF content
-        elements = []
-        elements.append(Paragraph("Mock Test Paper", title_style))
-        elements.append(Spacer(1, 12))
-
-        # Add sections for each marks value
-        for section_idx, marks in enumerate(sorted(grouped_questions.keys())):
-            questions = grouped_questions[marks]
-            section_letter = chr(65 + section_idx)  # A, B, C, ...
-            section_header = f"Section {section_letter}: {marks} Marks"
-            elements.append(Paragraph(section_header, section_style))
-            elements.append(Spacer(1, 6))
-
-            # Add questions in this section
-            for q_idx, q in enumerate(questions, 1):
-                question_text = f"{q_idx}. {q['question']}"
-                elements.append(Paragraph(question_text, question_style))
-                elements.append(Spacer(1, 12))
-
-        # Generate the PDF
-        doc.build(elements)
-        buffer.seek(0)
+        # Render the PDF off the event loop
+        import paper
+        with timed("mock_test", "render", len(all_questions), "questions"):
+            buffer = io.BytesIO(await run_cpu(paper.build_mock_test_paper, grouped_questions))
 
         # Return the PDF as a streaming response
         return StreamingResponse(
@@ -821,6 +1251,8 @@ async def export_mocktestpaper(request: MockTestRequest):
             media_type="application/pdf",
             headers={"Content-Disposition": "attachment; filename=mocktestpaper.pdf"}
         )
+    except HTTPException:
+        raise  # 400/503 (with Retry-After) etc. as they were raised
     except Exception as e:
         print(f"Error in export_mocktestpaper: {str(e)}")
         traceback.print_exc()
@@ -828,9 +1260,6 @@ async def export_mocktestpaper(request: MockTestRequest):
 
 
 # --- Static Files and React App ---
-tessdata_dir = os.path.join(os.getcwd(), 'tessdata')
-os.environ['TESSDATA_PREFIX'] = tessdata_dir
-
 app.mount("/static", StaticFiles(directory="frontend/dist", html=True), name="static")
 
 @app.get("/{full_path:path}")
@@ -0,0 +1,135 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Stage Metrics ---
+# Hot-path stages record their latency, and optionally a size (bytes, pages,
+# chars, questions), into Prometheus-style histograms. Stages that run in the
+# process pool record into the worker's own registry; executor.run_cpu drains
+# it after each task and merges it here, so /api/metrics sees every stage.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+DURATION_METRIC = "qpg_stage_duration_seconds"
+SIZE_METRIC = "qpg_stage_size"
+HELP = {
+    DURATION_METRIC: "Time spent in each pipeline stage.",
+    SIZE_METRIC: "Size of the input handled by each pipeline stage.",
+}
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (metric, labels) -> [bucket counts..., sum, count]
+        self._series: dict[tuple[str, tuple], list[float]] = {}
+
+    @staticmethod
+    def _buckets(metric: str) -> tuple:
+        return DURATION_BUCKETS if metric == DURATION_METRIC else SIZE_BUCKETS
+
+    def observe(self, metric: str, labels: tuple, value: float):
+        buckets = self._buckets(metric)
+        with self._lock:
+            series = self._series.setdefault((metric, labels), [0.0] * (len(buckets) + 2))
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def drain(self) -> dict:
+        with self._lock:
+            snapshot, self._series = self._series, {}
+        return snapshot
+
+    def merge(self, snapshot: dict):
+        with self._lock:
+            for key, values in snapshot.items():
+                series = self._series.setdefault(key, [0.0] * len(values))
+                for i, value in enumerate(values):
+                    series[i] += value
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        with self._lock:
+            series = sorted(self._series.items())
+        lines = []
+        for metric in (DURATION_METRIC, SIZE_METRIC):
+            lines.append(f"# HELP {metric} {HELP[metric]}")
+            lines.append(f"# TYPE {metric} histogram")
+            buckets = self._buckets(metric)
+            for (name, labels), values in series:
+                if name != metric:
+                    continue
+                label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+                for bound, count in zip(buckets, values):
+                    lines.append(f'{metric}_bucket{{{label_str},le="{bound}"}} {count:g}')
+                lines.append(f'{metric}_bucket{{{label_str},le="+Inf"}} {values[-1]:g}')
+                lines.append(f"{metric}_sum{{{label_str}}} {values[-2]:g}")
+                lines.append(f"{metric}_count{{{label_str}}} {values[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def render_cache_stats(caches: dict[str, dict]) -> str:
+    """Cache counters from ``{cache_name: cache.stats()}`` in the same format."""
+    lines = ["# HELP qpg_cache_events_total Cache lookups by outcome.",
+             "# TYPE qpg_cache_events_total counter"]
+    for cache, stats in caches.items():
+        for event, value in stats.items():
+            if event != "entries":
+                lines.append(f'qpg_cache_events_total{{cache="{cache}",event="{event}"}} {value}')
+    lines += ["# HELP qpg_cache_entries Entries currently held by each cache.",
+              "# TYPE qpg_cache_entries gauge"]
+    for cache, stats in caches.items():
+        if "entries" in stats:
+            lines.append(f'qpg_cache_entries{{cache="{cache}"}} {stats["entries"]}')
+    return "\n".join(lines) + "\n"
+
+
+def render_llm_stats(stats: dict) -> str:
+    """Gemini client counters and gauges from ``llm.stats()``."""
+    counters = ("calls", "errors", "retries", "rejected", "throttled_requests", "throttled_tokens",
+                "throttled_seconds", "circuit_trips")
+    lines = []
+    for name in counters:
+        lines += [f"# TYPE qpg_llm_{name}_total counter", f"qpg_llm_{name}_total {stats[name]:g}"]
+    for name in ("queued", "in_flight"):
+        lines += [f"# TYPE qpg_llm_{name} gauge", f"qpg_llm_{name} {stats[name]:g}"]
+    lines += ["# HELP qpg_llm_circuit_open 1 while the Gemini circuit breaker refuses calls.",
+              "# TYPE qpg_llm_circuit_open gauge",
+              f"qpg_llm_circuit_open {int(stats['circuit_state'] != 'closed')}"]
+    return "\n".join(lines) + "\n"
+
+
+def observe(pipeline: str, stage: str, seconds: float, size: float | None = None, unit: str | None = None):
+    registry.observe(DURATION_METRIC, (("pipeline", pipeline), ("stage", stage)), seconds)
+    if size is not None:
+        registry.observe(SIZE_METRIC, (("pipeline", pipeline), ("stage", stage), ("unit", unit or "")), size)
+
+
+class Stage:
+    def __init__(self):
+        self.size = None
+        self.unit = None
+
+    def record_size(self, size: float, unit: str):
+        self.size = size
+        self.unit = unit
+
+
+@contextmanager
+def timed(pipeline: str, stage: str, size: float | None = None, unit: str | None = None):
+    """Time a block as one stage; sizes known only afterwards go in via record_size."""
+    current = Stage()
+    if size is not None:
+        current.record_size(size, unit)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        observe(pipeline, stage, time.perf_counter() - start, current.size, current.unit)
+
@@ -0,0 +1,98 @@
+import os
+import queue
+import threading
+
+# --- OCR Backends ---
+# Tesseract behind one interface. "tesserocr" drives libtesseract in-process
+# and keeps initialized engines (language data loaded once) for the life of
+# the worker process; it needs `pip install tesserocr` against the system
+# libtesseract. "pytesseract" runs the tesseract binary per image and is the
+# fallback when tesserocr isn't available.
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "auto")  # auto | tesserocr | pytesseract
+OCR_LANG = os.environ.get("OCR_LANG", "eng")
+
+# Language data is configured once, here: passed to tesserocr engines and
+# exported for the tesseract binary. Without a tessdata directory Tesseract's
+# own default is used.
+TESSDATA_DIR = os.environ.get("TESSDATA_DIR", os.path.join(os.getcwd(), "tessdata"))
+if os.path.isdir(TESSDATA_DIR):
+    os.environ["TESSDATA_PREFIX"] = TESSDATA_DIR
+else:
+    TESSDATA_DIR = None
+
+
+class PytesseractBackend:
+    name = "pytesseract"
+
+    def __init__(self):
+        import pytesseract
+        self._pytesseract = pytesseract
+
+    def recognize(self, img, timeout: float = 0) -> str:
+        """OCR a PIL image; raises RuntimeError on timeout (0 = no limit)."""
+        return self._pytesseract.image_to_string(img, lang=OCR_LANG, timeout=timeout).strip()
+
+
+class TesserocrBackend:
+    name = "tesserocr"
+
+    def __init__(self):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self._lock = threading.Lock()
+        # Idle engines; a caller takes one, or creates one if none is idle, so
+        # there are never more engines than concurrent OCR calls in the process
+        self._idle = queue.SimpleQueue()
+        self.engines = 0
+        self._idle.put(self._new_engine())  # fail here, not on the first page
+
+    def _new_engine(self):
+        with self._lock:
+            self.engines += 1
+        if TESSDATA_DIR:
+            return self._tesserocr.PyTessBaseAPI(path=TESSDATA_DIR, lang=OCR_LANG)
+        return self._tesserocr.PyTessBaseAPI(lang=OCR_LANG)
+
+    def recognize(self, img, timeout: float = 0) -> str:
+        """OCR a PIL image; raises RuntimeError on timeout (0 = no limit)."""
+        try:
+            api = self._idle.get_nowait()
+        except queue.Empty:
+            api = self._new_engine()
+        try:
+            api.SetImage(img)
+            if not api.Recognize(int(timeout * 1000)):
+                raise RuntimeError("Tesseract process timeout")
+            return api.GetUTF8Text().strip()
+        finally:
+            api.Clear()
+            self._idle.put(api)
+
+
+BACKENDS = {
+    "tesserocr": TesserocrBackend,
+    "pytesseract": PytesseractBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: str = OCR_BACKEND):
+    if name != "auto":
+        return BACKENDS[name]()
+    try:
+        return TesserocrBackend()
+    except Exception as e:  # not installed, or no language data for OCR_LANG
+        print(f"[OCR backend] tesserocr unavailable ({e}), using pytesseract")
+        return PytesseractBackend()
+
+
+def get_backend():
+    """The process-wide backend, created on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
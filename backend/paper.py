@@ -0,0 +1,146 @@
+import io
+
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.enums import TA_LEFT
+
+# --- PDF Rendering ---
+# Plain functions over plain data so they can run in the process pool.
+# Styles and layouts are built once per process at import; a render only
+# constructs the flowables for its own questions.
+
+
+def build_styles() -> dict[str, ParagraphStyle]:
+    sample = getSampleStyleSheet()
+    return {
+        "Title": sample["Title"],
+        "QuestionNormal": ParagraphStyle(
+            "QuestionNormal",
+            parent=sample["BodyText"],
+            leftIndent=0,
+            spaceAfter=6,
+            fontName="Helvetica"
+        ),
+        "QuestionBold": ParagraphStyle(
+            "QuestionBold",
+            parent=sample["BodyText"],
+            leftIndent=0,
+            spaceAfter=6,
+            fontName="Helvetica-Bold"
+        ),
+        "Answer": ParagraphStyle(
+            "Answer",
+            parent=sample["BodyText"],
+            leftIndent=15,
+            spaceAfter=4,
+            fontName="Helvetica"
+        ),
+        "MockTitle": ParagraphStyle(
+            "MockTitle",
+            parent=sample["Heading1"],
+            fontSize=16,
+            spaceAfter=20,
+            alignment=TA_LEFT
+        ),
+        "Section": ParagraphStyle(
+            "Section",
+            parent=sample["Heading2"],
+            fontSize=14,
+            spaceAfter=12,
+            spaceBefore=12,
+            alignment=TA_LEFT
+        ),
+        "MockQuestion": ParagraphStyle(
+            "MockQuestion",
+            parent=sample["Normal"],
+            fontSize=12,
+            spaceAfter=12,
+            leading=14,
+            alignment=TA_LEFT
+        ),
+    }
+
+
+STYLES = build_styles()
+
+
+class PaperTemplate:
+    """Page layout and question formatting shared by every paper of one kind."""
+
+    def __init__(self, title: str, title_style: str, margins: tuple[int, int, int, int],
+                 question_style: str, question_gap: int, numbered: bool = False,
+                 show_marks: bool = False, bold_questions: bool = False):
+        self.title = title
+        self.title_style = STYLES[title_style]
+        self.right_margin, self.left_margin, self.top_margin, self.bottom_margin = margins
+        self.question_style = STYLES[question_style]
+        self.question_gap = question_gap
+        self.numbered = numbered
+        self.show_marks = show_marks
+        self.bold_questions = bold_questions
+
+    def question_flowables(self, number: int, q: dict) -> list:
+        text = q.get("question", "").replace("\n", "<br/>")
+        style = self.question_style
+        # Questions ending with ? stand out in bold
+        if self.bold_questions and text.strip().endswith('?'):
+            style = STYLES["QuestionBold"]
+
+        if self.numbered:
+            text = f"{number}. {text}"
+        marks = q.get("marks", "")
+        if self.show_marks and marks:
+            text += f" <i>({marks} marks)</i>"
+        elements = [Paragraph(text, style)]
+
+        # If answer/choices present, show directly below (NO numbering)
+        raw_answer = q.get("answer")
+        answer = raw_answer.strip() if isinstance(raw_answer, str) else ""
+        if answer:
+            for line in answer.split("\n"):
+                elements.append(Paragraph(line.strip(), STYLES["Answer"]))
+
+        elements.append(Spacer(1, self.question_gap))
+        return elements
+
+    def render(self, sections: list[dict]) -> bytes:
+        """Render ``[{"heading": str | None, "questions": [{question, marks, answer}]}]``."""
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4,
+                                rightMargin=self.right_margin, leftMargin=self.left_margin,
+                                topMargin=self.top_margin, bottomMargin=self.bottom_margin)
+
+        elements = [Paragraph(self.title, self.title_style), Spacer(1, 12)]
+        for section in sections:
+            heading = section.get("heading")
+            if heading:
+                elements.append(Paragraph(heading, STYLES["Section"]))
+                elements.append(Spacer(1, 6))
+            for number, q in enumerate(section["questions"], 1):
+                elements.extend(self.question_flowables(number, q))
+
+        doc.build(elements)
+        return buffer.getvalue()
+
+
+QUESTION_PAPER = PaperTemplate(
+    "Generated Question Paper", "Title", margins=(40, 40, 50, 50),
+    question_style="QuestionNormal", question_gap=6, show_marks=True, bold_questions=True
+)
+MOCK_TEST_PAPER = PaperTemplate(
+    "Mock Test Paper", "MockTitle", margins=(72, 72, 72, 18),
+    question_style="MockQuestion", question_gap=12, numbered=True
+)
+
+
+def build_question_paper(questions: list[dict]) -> bytes:
+    return QUESTION_PAPER.render([{"questions": questions}])
+
+
+def build_mock_test_paper(grouped_questions: dict[int, list[dict]]) -> bytes:
+    sections = [
+        {"heading": f"Section {chr(65 + idx)}: {marks} Marks", "questions": grouped_questions[marks]}
+        for idx, marks in enumerate(sorted(grouped_questions))
+    ]
+    return MOCK_TEST_PAPER.render(sections)
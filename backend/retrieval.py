@@ -0,0 +1,83 @@
+import math
+import os
+import re
+
+import numpy as np
+
+# --- Syllabus Retrieval ---
+# The syllabus is split into chunks at upload and indexed with BM25, so
+# answering a question only sends the top-k relevant chunks to Gemini instead
+# of the whole document.
+RETRIEVAL_CHUNK_WORDS = int(os.environ.get("RETRIEVAL_CHUNK_WORDS", 120))
+RETRIEVAL_TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", 5))
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def chunk_text(text: str, chunk_words: int = RETRIEVAL_CHUNK_WORDS) -> list[str]:
+    """Group whole lines into chunks of roughly ``chunk_words`` words."""
+    chunks = []
+    current = []
+    words = 0
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        current.append(line)
+        words += len(line.split())
+        if words >= chunk_words:
+            chunks.append("\n".join(current))
+            current = []
+            words = 0
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class BM25Index:
+    def __init__(self, chunks: list[str], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        docs = [tokenize(c) for c in chunks]
+        doc_len = np.array([len(d) for d in docs], dtype=np.float32)
+        avg_len = float(doc_len.mean()) if len(docs) and doc_len.mean() else 1.0
+        # Length normalisation term of the BM25 denominator, per chunk
+        self._norm = k1 * (1 - b + b * doc_len / avg_len)
+
+        # Postings: term -> (chunk ids, term frequencies)
+        counts: dict[str, dict[int, int]] = {}
+        for doc_id, tokens in enumerate(docs):
+            for token in tokens:
+                tf = counts.setdefault(token, {})
+                tf[doc_id] = tf.get(doc_id, 0) + 1
+
+        n = len(docs)
+        self._postings: dict[str, tuple[np.ndarray, np.ndarray, float]] = {}
+        for term, tf in counts.items():
+            ids = np.fromiter(tf.keys(), dtype=np.int32, count=len(tf))
+            freqs = np.fromiter(tf.values(), dtype=np.float32, count=len(tf))
+            idf = math.log(1 + (n - len(tf) + 0.5) / (len(tf) + 0.5))
+            self._postings[term] = (ids, freqs, idf)
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K) -> list[int]:
+        """Indices of the top-k chunks for ``query``, in document order."""
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            ids, freqs, idf = posting
+            scores[ids] += idf * freqs * (self.k1 + 1) / (freqs + self._norm[ids])
+
+        hits = np.flatnonzero(scores)
+        if not len(hits):
+            return []
+        top = hits[np.argsort(-scores[hits], kind="stable")[:k]]
+        return sorted(top.tolist())
+
+    def relevant_text(self, query: str, k: int = RETRIEVAL_TOP_K) -> str:
+        return "\n\n".join(self.chunks[i] for i in self.search(query, k))
@@ -0,0 +1,131 @@
+import os
+import re
+from bisect import bisect_right
+from collections import OrderedDict
+
+# --- Syllabus Store ---
+# Each user/session gets its own parsed syllabus instead of sharing one
+# syllabus.txt. Unit boundaries are scanned once at upload, so slicing out a
+# chapter is a dictionary hit (or one find + bisect the first time a new
+# chapter name is asked for) rather than a full re-scan per request. Only
+# chapters that were found are remembered, the most recent
+# SYLLABUS_SPAN_CACHE_SIZE per syllabus, so arbitrary names from clients
+# can't grow a session's index.
+UNIT_PATTERN = re.compile(r"(?:unit[\s\-]*\d+\b)")
+SYLLABUS_STORE_SIZE = int(os.environ.get("SYLLABUS_STORE_SIZE", 1000))
+SYLLABUS_SPAN_CACHE_SIZE = int(os.environ.get("SYLLABUS_SPAN_CACHE_SIZE", 256))
+DEFAULT_SESSION = "default"
+
+
+class SyllabusIndex:
+    def __init__(self, text: str):
+        self.text = text
+        self._lower = text.lower()
+        self.unit_starts = [m.start() for m in UNIT_PATTERN.finditer(self._lower)]
+        self._spans: OrderedDict[str, tuple[int, int]] = OrderedDict()
+        # NumPy comes in with the retriever, on the first syllabus upload
+        from retrieval import BM25Index, chunk_text
+        self.retriever = BM25Index(chunk_text(text))
+
+        # Pre-index every unit by its label ("unit 3") and its heading line
+        for start in self.unit_starts:
+            label = UNIT_PATTERN.match(self._lower, start).group(0)
+            line_end = self._lower.find("\n", start)
+            heading = self._lower[start:line_end if line_end != -1 else len(self._lower)]
+            for key in (label, heading):
+                key = key.strip()
+                if key and key not in self._spans:
+                    self._remember(key, self._find_span(key))
+
+    def _find_span(self, key: str) -> tuple[int, int] | None:
+        start = self._lower.find(key)
+        return None if start == -1 else self._span_at(start)
+
+    def _span_at(self, start: int) -> tuple[int, int]:
+        # Chapter runs from its first mention to the next unit boundary after it
+        idx = bisect_right(self.unit_starts, start)
+        end = self.unit_starts[idx] if idx < len(self.unit_starts) else len(self.text)
+        return start, end
+
+    def _remember(self, key: str, span: tuple[int, int] | None) -> tuple[int, int] | None:
+        if span is not None:
+            self._spans[key] = span
+            self._spans.move_to_end(key)
+            while len(self._spans) > SYLLABUS_SPAN_CACHE_SIZE:
+                self._spans.popitem(last=False)
+        return span
+
+    def _span(self, key: str) -> tuple[int, int] | None:
+        span = self._spans.get(key)
+        if span is None:
+            return self._remember(key, self._find_span(key))
+        self._spans.move_to_end(key)
+        return span
+
+    def _slice(self, span: tuple[int, int] | None) -> str | None:
+        return None if span is None else self.text[span[0]:span[1]].strip()
+
+    def chapter(self, name: str) -> str | None:
+        return self._slice(self._span(name.strip().lower()))
+
+    def chapters(self, names: list[str]) -> dict[str, str | None]:
+        """chapter() for many names, locating the ones not indexed yet in one pass."""
+        keys = {name: name.strip().lower() for name in names}
+        missing = sorted({key for key in keys.values() if key and key not in self._spans}, key=len, reverse=True)
+        spans: dict[str, tuple[int, int] | None] = {}
+        if missing:
+            # A zero-width match at every position, so overlapping names are all
+            # seen; at one position the longest name wins
+            found: dict[str, int] = {}
+            for m in re.finditer("(?=(" + "|".join(map(re.escape, missing)) + "))", self._lower):
+                found.setdefault(m.group(1), m.start())
+                if len(found) == len(missing):
+                    break
+            for key in missing:
+                if any(key in other for other in missing if other != key):
+                    # Can be hidden by a longer name at the same position
+                    spans[key] = self._remember(key, self._find_span(key))
+                else:
+                    spans[key] = self._remember(key, self._span_at(found[key]) if key in found else None)
+        return {name: self._slice(spans[key] if key in spans else self._span(key)) if key else None
+                for name, key in keys.items()}
+
+    def context_for(self, question: str, k: int | None = None) -> str:
+        """Syllabus text relevant to ``question`` for an answer prompt."""
+        from retrieval import RETRIEVAL_TOP_K
+        k = k or RETRIEVAL_TOP_K
+        if len(self.retriever.chunks) <= k:
+            return self.text
+        # No lexical overlap at all: let the model see everything, as before
+        return self.retriever.relevant_text(question, k) or self.text
+
+
+class SyllabusStore:
+    def __init__(self, max_sessions: int, legacy_path: str | None = None):
+        self.max_sessions = max_sessions
+        self.legacy_path = legacy_path
+        self._sessions: OrderedDict[str, SyllabusIndex] = OrderedDict()
+
+    def put(self, session_id: str, text: str) -> SyllabusIndex:
+        index = SyllabusIndex(text)
+        self._sessions[session_id] = index
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return index
+
+    def get(self, session_id: str) -> SyllabusIndex | None:
+        index = self._sessions.get(session_id)
+        if index is not None:
+            self._sessions.move_to_end(session_id)
+            return index
+
+        # Clients that don't send a session id fall back to the last syllabus
+        # written to disk, loaded once
+        if session_id == DEFAULT_SESSION and self.legacy_path:
+            try:
+                with open(self.legacy_path, "r", encoding="utf-8") as f:
+                    return self.put(session_id, f.read())
+            except FileNotFoundError:
+                return None
+        return None